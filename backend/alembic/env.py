@@ -11,7 +11,7 @@ from alembic import context
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
 from db.session import Base
-from db.models import Project, GalleryImage, Skill, Message, Admin, Settings
+from db.models import Project, GalleryImage, Skill, Message, Admin, Settings, DashboardCounter, Blob, BlobRef, Upload
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
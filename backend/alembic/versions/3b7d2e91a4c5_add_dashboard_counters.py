@@ -0,0 +1,40 @@
+"""add_dashboard_counters
+
+Revision ID: 3b7d2e91a4c5
+Revises: fc0860da72f8
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7d2e91a4c5'
+down_revision: Union[str, None] = 'fc0860da72f8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def table_exists(table_name: str) -> bool:
+    """Check if a table exists in the database."""
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    return table_name in inspector.get_table_names()
+
+
+def upgrade() -> None:
+    # Values are seeded by the application's reconciliation on startup
+    if not table_exists('dashboard_counters'):
+        op.create_table('dashboard_counters',
+            sa.Column('name', sa.String(length=50), nullable=False),
+            sa.Column('value', sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint('name')
+        )
+
+
+def downgrade() -> None:
+    op.drop_table('dashboard_counters')
@@ -0,0 +1,54 @@
+"""add_blob_store
+
+Revision ID: 8e4f1c6a2b7d
+Revises: 3b7d2e91a4c5
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e4f1c6a2b7d'
+down_revision: Union[str, None] = '3b7d2e91a4c5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def table_exists(table_name: str) -> bool:
+    """Check if a table exists in the database."""
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    return table_name in inspector.get_table_names()
+
+
+def upgrade() -> None:
+    # Files uploaded before the blob store existed are simply not tracked
+    if not table_exists('blobs'):
+        op.create_table('blobs',
+            sa.Column('sha256', sa.String(length=64), nullable=False),
+            sa.Column('size', sa.Integer(), nullable=False),
+            sa.Column('ref_count', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+            sa.PrimaryKeyConstraint('sha256')
+        )
+
+    if not table_exists('blob_refs'):
+        op.create_table('blob_refs',
+            sa.Column('path', sa.String(length=500), nullable=False),
+            sa.Column('sha256', sa.String(length=64), nullable=False),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+            sa.ForeignKeyConstraint(['sha256'], ['blobs.sha256'], ),
+            sa.PrimaryKeyConstraint('path')
+        )
+        op.create_index(op.f('ix_blob_refs_sha256'), 'blob_refs', ['sha256'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_blob_refs_sha256'), table_name='blob_refs')
+    op.drop_table('blob_refs')
+    op.drop_table('blobs')
@@ -0,0 +1,51 @@
+"""add_uploads_index
+
+Revision ID: c2a9d4e7f310
+Revises: 8e4f1c6a2b7d
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2a9d4e7f310'
+down_revision: Union[str, None] = '8e4f1c6a2b7d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def table_exists(table_name: str) -> bool:
+    """Check if a table exists in the database."""
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    return table_name in inspector.get_table_names()
+
+
+def upgrade() -> None:
+    # Existing files are indexed from disk on the first application start
+    if not table_exists('uploads'):
+        op.create_table('uploads',
+            sa.Column('filename', sa.String(length=255), nullable=False),
+            sa.Column('size', sa.Integer(), nullable=False),
+            sa.Column('mime_type', sa.String(length=100), nullable=False),
+            sa.Column('width', sa.Integer(), nullable=True),
+            sa.Column('height', sa.Integer(), nullable=True),
+            sa.Column('sha256', sa.String(length=64), nullable=False),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+            sa.PrimaryKeyConstraint('filename')
+        )
+        op.create_index(op.f('ix_uploads_sha256'), 'uploads', ['sha256'], unique=False)
+        op.create_index('ix_uploads_created_at_filename', 'uploads', ['created_at', 'filename'], unique=False)
+        op.create_index('ix_uploads_size_filename', 'uploads', ['size', 'filename'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_uploads_size_filename', table_name='uploads')
+    op.drop_index('ix_uploads_created_at_filename', table_name='uploads')
+    op.drop_index(op.f('ix_uploads_sha256'), table_name='uploads')
+    op.drop_table('uploads')
@@ -1,14 +1,22 @@
+import logging
+
 from sqladmin import Admin, ModelView, BaseView, expose
 from sqladmin.authentication import AuthenticationBackend
 from starlette.requests import Request
 from starlette.responses import RedirectResponse
 from markupsafe import Markup
+from sqlalchemy import select
+from sqlalchemy.orm import defer, raiseload, selectinload
 from wtforms import StringField, TextAreaField
 from wtforms.widgets import TextInput
 
+from core.cache import ResponseCache, project_cache, skill_cache, settings_cache
 from core.config import settings
 from db.models import Project, Skill, Message, Admin as AdminModel, Settings, GalleryImage
 from core.widgets import TypeSelectorWidget, CodeEditorWidget, StatusToggleWidget, ZipUploadWidget
+from services.images import load_manifests, thumbnail_url
+
+logger = logging.getLogger(__name__)
 
 
 class ImageUploadWidget(TextInput):
@@ -46,6 +54,28 @@ class ImageUploadWidget(TextInput):
         ''')
 
 
+class CacheInvalidationMixin:
+    """Drops the public API cache of the edited model in every worker after admin saves and deletes."""
+
+    cache: ResponseCache
+
+    async def after_model_change(self, data, model, is_created, request) -> None:
+        self.cache.invalidate()
+
+    async def after_model_delete(self, model, request) -> None:
+        self.cache.invalidate()
+
+
+class ThumbnailMixin:
+    """Loads the variant manifests of a list page's images before its thumbnails are rendered."""
+
+    async def list(self, request: Request):
+        pagination = await super().list(request)
+        # Column formatters are synchronous; they only read manifests loaded here
+        await load_manifests(row.image_url for row in pagination.rows)
+        return pagination
+
+
 class AdminAuth(AuthenticationBackend):
     async def login(self, request: Request) -> bool:
         form = await request.form()
@@ -295,7 +325,9 @@ def _render_preview_button(project):
     return Markup(button_html)
 
 
-class ProjectAdmin(ModelView, model=Project):
+class ProjectAdmin(CacheInvalidationMixin, ThumbnailMixin, ModelView, model=Project):
+    cache = project_cache
+
     column_list = [
         Project.id, Project.title, Project.slug, 
         Project.project_type, Project.status,
@@ -327,7 +359,7 @@ class ProjectAdmin(ModelView, model=Project):
     
     column_formatters = {
         Project.image_url: lambda m, a: Markup(
-            f'<img src="{m.image_url}" style="max-height:50px;border-radius:4px;">'
+            f'<img src="{thumbnail_url(m.image_url, 240)}" loading="lazy" style="max-height:50px;border-radius:4px;">'
         ) if m.image_url else "-",
         Project.is_featured: lambda m, a: "⭐" if m.is_featured else "",
         Project.slug: lambda m, a: Markup(f'<code style="color:#6366f1;">{m.slug}</code>') if m.slug else "-",
@@ -383,9 +415,19 @@ class ProjectAdmin(ModelView, model=Project):
     # Custom list template with drag-drop reorder functionality
     # Requirements: 3.3
     list_template = "admin/project_list.html"
+    
+    def list_query(self, request: Request):
+        # The list never shows gallery images; fail loudly instead of lazy loading them per row.
+        # static_content (inline HTML) is not a list column either, so it stays in the database
+        return select(Project).options(
+            raiseload(Project.gallery_images),
+            defer(Project.static_content, raiseload=True),
+        )
 
 
-class SkillAdmin(ModelView, model=Skill):
+class SkillAdmin(CacheInvalidationMixin, ModelView, model=Skill):
+    cache = skill_cache
+
     column_list = [Skill.id, Skill.name, Skill.category, Skill.level, Skill.icon, Skill.order]
     column_searchable_list = [Skill.name, Skill.category]
     column_sortable_list = [Skill.id, Skill.name, Skill.category, Skill.level, Skill.order]
@@ -448,7 +490,9 @@ class MessageAdmin(ModelView, model=Message):
     icon = "fa-solid fa-envelope"
 
 
-class SettingsAdmin(ModelView, model=Settings):
+class SettingsAdmin(CacheInvalidationMixin, ModelView, model=Settings):
+    cache = settings_cache
+
     column_list = [Settings.id, Settings.key, Settings.value, Settings.description]
     column_searchable_list = [Settings.key]
     
@@ -468,7 +512,7 @@ class SettingsAdmin(ModelView, model=Settings):
     icon = "fa-solid fa-gear"
 
 
-class GalleryImageAdmin(ModelView, model=GalleryImage):
+class GalleryImageAdmin(ThumbnailMixin, ModelView, model=GalleryImage):
     """
     Admin view for managing gallery images.
     Supports image preview, inline editing, and project linking.
@@ -513,7 +557,7 @@ class GalleryImageAdmin(ModelView, model=GalleryImage):
         # Image preview with thumbnail
         "image_preview": lambda m, a: Markup(
             f'<div style="position:relative;">'
-            f'<img src="{m.image_url}" style="max-height:80px;max-width:120px;border-radius:8px;'
+            f'<img src="{thumbnail_url(m.image_url, 240)}" loading="lazy" style="max-height:80px;max-width:120px;border-radius:8px;'
             f'border:2px solid #374151;object-fit:cover;cursor:pointer;" '
             f'onclick="window.open(\'{m.image_url}\', \'_blank\')" '
             f'title="Click to view full size">'
@@ -560,25 +604,37 @@ class GalleryImageAdmin(ModelView, model=GalleryImage):
     # Requirements: 4.2
     list_template = "admin/gallery_list.html"
     
-    async def on_model_delete(self, model: GalleryImage) -> None:
+    def list_query(self, request: Request):
+        """
+        Load the linked projects for the whole page in one extra query.
+        The project_id formatter reads m.project.title, which would otherwise
+        lazy load once per row (and fail outright on the async session).
+        Rows pointing at the same project share one identity-mapped instance.
+        """
+        return select(GalleryImage).options(
+            selectinload(GalleryImage.project).load_only(Project.id, Project.title)
+        )
+    
+    async def after_model_delete(self, model: GalleryImage, request: Request) -> None:
         """
-        Override delete to remove image file from storage.
+        Remove the image file from storage once the record is deleted.
+        The file is kept while another project or gallery image uses the same
+        content, and the underlying blob while other files reference it.
         Requirements: 4.5
         """
-        import os
         from pathlib import Path
+        from services.uploads import delete_uploads, referenced_uploads
         
-        if model.image_url:
-            # Extract filename from URL (e.g., /uploads/filename.jpg -> uploads/filename.jpg)
-            file_path = model.image_url.lstrip('/')
-            
-            # Check if file exists and delete it
-            if os.path.exists(file_path):
-                try:
-                    os.remove(file_path)
-                except (OSError, PermissionError) as e:
-                    # Log error but don't prevent deletion of database record
-                    print(f"Warning: Could not delete file {file_path}: {e}")
+        if model.image_url and model.image_url.startswith('/uploads/'):
+            # Extract filename from URL (e.g., /uploads/filename.jpg -> filename.jpg)
+            filename = Path(model.image_url).name
+            try:
+                async with self.session_maker() as session:
+                    if not await referenced_uploads(session, [filename]):
+                        await delete_uploads(session, [filename])
+            except OSError as e:
+                # Log error but don't fail the already committed deletion
+                logger.warning(f"Could not delete file uploads/{filename}: {e}")
 
 
 class StatsView(BaseView):
@@ -0,0 +1,204 @@
+"""
+In-process caches for the public read endpoints.
+
+Entries hold already serialized JSON bodies, so a cache hit costs a dictionary
+lookup instead of a database round-trip plus Pydantic validation. Every write
+path that touches the cached data must call ``invalidate()``.
+
+Gunicorn runs several workers, each with its own caches. Invalidations are
+propagated through ``GenerationBus``: a tiny memory-mapped file holding one
+counter per namespace. A write bumps the counter; every worker compares it
+with the generation its entries were built from on each lookup and drops them
+when it moved. No outside service is needed and a check is a memory read.
+
+Each payload carries a strong ETag (hash of the body) and, for single
+records, a Last-Modified value, so ``json_response`` can answer conditional
+requests with 304 without touching the database or the serializer. Lists get
+no Last-Modified: removing an item changes them without a newer timestamp.
+
+Bodies built from database rows are encoded with orjson directly
+(``dump_json``); the rows come from our own schema, so the Pydantic
+validation round-trip would only re-check trusted data.
+"""
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+import orjson
+from starlette.requests import Request
+from starlette.responses import Response
+
+from core.config import settings
+
+_COUNTER = struct.Struct("<Q")
+
+
+class GenerationBus:
+    """Generation counters shared by all worker processes via a mmap'd file."""
+
+    NAMESPACES = ("projects", "skills", "settings")
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+        self._map: Optional[mmap.mmap] = None
+
+    def _mapping(self) -> mmap.mmap:
+        if self._map is None:
+            size = _COUNTER.size * len(self.NAMESPACES)
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(fd).st_size < size:
+                    os.ftruncate(fd, size)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            self._fd = fd
+            self._map = mmap.mmap(fd, size)
+        return self._map
+
+    def _offset(self, namespace: str) -> int:
+        return self.NAMESPACES.index(namespace) * _COUNTER.size
+
+    def current(self, namespace: str) -> int:
+        return _COUNTER.unpack_from(self._mapping(), self._offset(namespace))[0]
+
+    def bump(self, namespace: str) -> int:
+        mapping = self._mapping()
+        offset = self._offset(namespace)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            generation = _COUNTER.unpack_from(mapping, offset)[0] + 1
+            _COUNTER.pack_into(mapping, offset, generation)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        return generation
+
+
+@dataclass(frozen=True)
+class CachedPayload:
+    """Serialized JSON body together with its validators."""
+
+    body: bytes
+    etag: str
+    last_modified: Optional[datetime] = None
+
+    @classmethod
+    def build(cls, body: bytes, last_modified: Optional[datetime] = None) -> "CachedPayload":
+        etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        if last_modified is not None:
+            if last_modified.tzinfo is None:
+                # SQLite hands back naive UTC timestamps
+                last_modified = last_modified.replace(tzinfo=timezone.utc)
+            last_modified = last_modified.astimezone(timezone.utc).replace(microsecond=0)
+        return cls(body=body, etag=etag, last_modified=last_modified)
+
+
+def dump_json(value: Any) -> bytes:
+    """
+    Encode trusted data with orjson. ``OPT_UTC_Z`` writes UTC datetimes as
+    ``Z`` like Pydantic does, so the bodies match the schemas' own JSON.
+    """
+    return orjson.dumps(value, option=orjson.OPT_UTC_Z)
+
+
+def join_json_array(items: Iterable[bytes]) -> bytes:
+    """JSON array of already encoded items."""
+    return b"[" + b",".join(items) + b"]"
+
+
+class ResponseCache:
+    """Serialized payloads for a single data namespace (projects, skills, ...)."""
+
+    def __init__(self, name: str, bus: GenerationBus):
+        self.name = name
+        self.bus = bus
+        self._entries: Dict[Hashable, CachedPayload] = {}
+        self._generation = -1
+
+    def get(self, key: Hashable) -> Tuple[Optional[CachedPayload], int]:
+        """
+        Look up a payload. Also returns the generation it was looked up in;
+        pass it to ``set()`` when storing a payload built after a miss.
+        """
+        generation = self.bus.current(self.name)
+        if generation != self._generation:
+            # Another worker invalidated the namespace
+            self._entries.clear()
+            self._generation = generation
+        return self._entries.get(key), generation
+
+    def set(self, key: Hashable, payload: CachedPayload, generation: int) -> CachedPayload:
+        """
+        Store a payload built from data read in ``generation``. Nothing is
+        stored if an invalidation (here or in another worker) landed since,
+        because the payload may predate that write.
+        """
+        if self.bus.current(self.name) != generation:
+            return payload
+        if generation != self._generation:
+            self._entries.clear()
+            self._generation = generation
+        self._entries[key] = payload
+        return payload
+
+    def invalidate(self) -> None:
+        self._generation = self.bus.bump(self.name)
+        self._entries.clear()
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    # Weak comparison: nginx downgrades strong ETags to W/ when it gzips the body
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+
+def _not_modified_since(if_modified_since: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified <= since
+
+
+def json_response(request: Request, payload: CachedPayload) -> Response:
+    """
+    Build a JSON response for a cached payload, honouring If-None-Match and
+    If-Modified-Since. Clients are asked to revalidate every time, which is a
+    cheap 304 as long as the data has not changed.
+    """
+    headers = {"ETag": payload.etag, "Cache-Control": "no-cache"}
+    if payload.last_modified is not None:
+        headers["Last-Modified"] = format_datetime(payload.last_modified, usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        not_modified = etag_matches(if_none_match, payload.etag)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        not_modified = (
+            if_modified_since is not None
+            and payload.last_modified is not None
+            and _not_modified_since(if_modified_since, payload.last_modified)
+        )
+
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+    return Response(content=payload.body, media_type="application/json", headers=headers)
+
+
+cache_bus = GenerationBus(settings.CACHE_BUS_PATH)
+
+project_cache = ResponseCache("projects", cache_bus)
+skill_cache = ResponseCache("skills", cache_bus)
+settings_cache = ResponseCache("settings", cache_bus)
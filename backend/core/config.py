@@ -1,5 +1,6 @@
 import os
 from functools import lru_cache
+from typing import List, Optional
 from pydantic_settings import BaseSettings
 
 
@@ -7,6 +8,27 @@ class Settings(BaseSettings):
     DEBUG: bool = False
     
     DATABASE_URL: str = "sqlite:///portfolio.db"
+    # Replica for public reads; defaults to the primary opened read-only.
+    # Replica lag can leave a stale payload in the response cache until the next write
+    DATABASE_READ_URL: Optional[str] = None
+    
+    # Connection pool per gunicorn worker (Postgres: 4 workers x (5 + 10) connections max)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # asyncpg prepared statement caches (set both to 0 behind pgbouncer in transaction mode)
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 100
+    
+    # SQLite PRAGMAs applied to every connection
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    # Negative values are KiB: 64MB page cache per connection
+    SQLITE_CACHE_SIZE: int = -64000
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
     
     ADMIN_USERNAME: str = "admin"
     ADMIN_PASSWORD: str = "changeme"
@@ -14,6 +36,48 @@ class Settings(BaseSettings):
     
     CORS_ORIGINS: list[str] = ["https://doazhu.pro", "http://localhost:3000"]
     
+    # Memory-mapped file shared by all workers to broadcast cache invalidations
+    CACHE_BUS_PATH: str = "/tmp/portfolio-cache.bus"
+    
+    # How many files /admin/api/gallery/bulk writes at the same time
+    GALLERY_UPLOAD_CONCURRENCY: int = 4
+    
+    # Seconds between dashboard counter reconciliations (0 disables the job)
+    COUNTERS_RECONCILE_INTERVAL: int = 3600
+    
+    # Contact form write-behind queue
+    MESSAGE_QUEUE_MAX_SIZE: int = 1000
+    MESSAGE_BATCH_SIZE: int = 50
+    MESSAGE_FLUSH_INTERVAL_MS: int = 200
+    
+    # Request profiling middleware, exposed at /admin/api/metrics
+    PROFILING_ENABLED: bool = False
+    PROFILING_N_PLUS_ONE_THRESHOLD: int = 5
+    
+    # In-memory LRU for small static project files (index.html, CSS, JS)
+    STATIC_PROJECT_CACHE_BYTES: int = 32 * 1024 * 1024
+    STATIC_PROJECT_CACHE_MAX_FILE_SIZE: int = 256 * 1024
+    
+    # Number of static project builds kept for rollback
+    STATIC_PROJECT_BUILDS_KEEP: int = 3
+    
+    # Threads used to precompress static project assets after extraction
+    PRECOMPRESS_WORKERS: int = 4
+    
+    # Content-addressed store backing uploads and static project files;
+    # hard links need it on the same filesystem (the uploads volume)
+    BLOB_STORE_DIR: str = "uploads/.blobs"
+    
+    # Responsive image variants rendered in a process pool after upload
+    IMAGE_WORKERS: int = 2
+    IMAGE_DERIVATIVE_WIDTHS: List[int] = [120, 240, 480, 960, 1600]
+    IMAGE_DERIVATIVE_QUALITY: int = 80
+    
+    # On-demand sizes (/uploads/{file}?w=&h=&fmt=), cached on disk with LRU eviction
+    IMAGE_RESIZE_CACHE_DIR: str = "uploads/.resized"
+    IMAGE_RESIZE_CACHE_BYTES: int = 256 * 1024 * 1024
+    IMAGE_RESIZE_MAX_DIMENSION: int = 2560
+    
     class Config:
         env_file = ".env"
         extra = "ignore"
@@ -0,0 +1,205 @@
+"""
+Opt-in request profiling (``PROFILING_ENABLED``).
+
+``ProfilingMiddleware`` times every HTTP request. SQLAlchemy cursor events on
+the engine attribute database time and query counts to the request that ran
+them, and the response cache reports serialization time through
+``serialization_timer``. Aggregates are kept per route in each worker and
+exposed at /admin/api/metrics as JSON or Prometheus text.
+
+A request that runs the same SQL statement ``PROFILING_N_PLUS_ONE_THRESHOLD``
+times or more is flagged as a likely N+1 pattern.
+"""
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+@dataclass
+class RequestProfile:
+    """Measurements collected while a single request is being handled."""
+    db_time: float = 0.0
+    query_count: int = 0
+    serialization_time: float = 0.0
+    statements: Counter = field(default_factory=Counter)
+
+
+_current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("request_profile", default=None)
+
+
+@dataclass
+class RouteStats:
+    """Aggregated measurements for one method + route template."""
+    count: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+    buckets: list = field(default_factory=lambda: [0] * len(LATENCY_BUCKETS))
+    db_time: float = 0.0
+    query_count: int = 0
+    max_queries: int = 0
+    serialization_time: float = 0.0
+    n_plus_one_requests: int = 0
+    n_plus_one_statements: Dict[str, int] = field(default_factory=dict)
+
+    def record(self, duration: float, profile: RequestProfile, repeated: Dict[str, int]) -> None:
+        self.count += 1
+        self.total_time += duration
+        self.max_time = max(self.max_time, duration)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if duration <= bound:
+                self.buckets[i] += 1
+                break
+        self.db_time += profile.db_time
+        self.query_count += profile.query_count
+        self.max_queries = max(self.max_queries, profile.query_count)
+        self.serialization_time += profile.serialization_time
+        if repeated:
+            self.n_plus_one_requests += 1
+            for statement, times in repeated.items():
+                self.n_plus_one_statements[statement] = max(
+                    self.n_plus_one_statements.get(statement, 0), times
+                )
+
+    def to_dict(self) -> dict:
+        avg = (lambda total: total / self.count if self.count else 0.0)
+        return {
+            "count": self.count,
+            "avg_ms": round(avg(self.total_time) * 1000, 3),
+            "max_ms": round(self.max_time * 1000, 3),
+            "avg_db_ms": round(avg(self.db_time) * 1000, 3),
+            "avg_queries": round(avg(self.query_count), 2),
+            "max_queries": self.max_queries,
+            "avg_serialization_ms": round(avg(self.serialization_time) * 1000, 3),
+            "latency_buckets": {
+                str(bound): hits for bound, hits in zip(LATENCY_BUCKETS, self.buckets)
+            },
+            "n_plus_one_requests": self.n_plus_one_requests,
+            "n_plus_one_statements": self.n_plus_one_statements,
+        }
+
+
+class ProfilingRegistry:
+    """Per-worker store of route statistics."""
+
+    def __init__(self, n_plus_one_threshold: int):
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.routes: Dict[Tuple[str, str], RouteStats] = {}
+
+    def record(self, method: str, route: str, duration: float, profile: RequestProfile) -> None:
+        repeated = {
+            statement: times for statement, times in profile.statements.items()
+            if times >= self.n_plus_one_threshold
+        }
+        if repeated:
+            logger.warning(
+                f"Possible N+1 on {method} {route}: "
+                + "; ".join(f"{times}x {statement[:120]}" for statement, times in repeated.items())
+            )
+        self.routes.setdefault((method, route), RouteStats()).record(duration, profile, repeated)
+
+    def snapshot(self) -> dict:
+        return {
+            f"{method} {route}": stats.to_dict()
+            for (method, route), stats in sorted(self.routes.items(), key=lambda item: item[0][1])
+        }
+
+    def prometheus(self) -> str:
+        lines = [
+            "# HELP portfolio_request_duration_seconds Request latency by route",
+            "# TYPE portfolio_request_duration_seconds histogram",
+        ]
+        for (method, route), stats in self.routes.items():
+            labels = f'method="{method}",route="{route}"'
+            cumulative = 0
+            for bound, hits in zip(LATENCY_BUCKETS, stats.buckets):
+                cumulative += hits
+                lines.append(f'portfolio_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'portfolio_request_duration_seconds_bucket{{{labels},le="+Inf"}} {stats.count}')
+            lines.append(f"portfolio_request_duration_seconds_sum{{{labels}}} {stats.total_time}")
+            lines.append(f"portfolio_request_duration_seconds_count{{{labels}}} {stats.count}")
+
+        counters = (
+            ("portfolio_request_db_seconds_total", "Time spent in database queries", "db_time"),
+            ("portfolio_request_queries_total", "Number of database queries", "query_count"),
+            ("portfolio_request_serialization_seconds_total", "Time spent serializing responses", "serialization_time"),
+            ("portfolio_request_n_plus_one_total", "Requests flagged as N+1 query patterns", "n_plus_one_requests"),
+        )
+        for name, help_text, attr in counters:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for (method, route), stats in self.routes.items():
+                lines.append(f'{name}{{method="{method}",route="{route}"}} {getattr(stats, attr)}')
+        return "\n".join(lines) + "\n"
+
+
+registry = ProfilingRegistry(settings.PROFILING_N_PLUS_ONE_THRESHOLD)
+
+
+def install_query_hooks(engine: AsyncEngine) -> None:
+    """Attribute query time and count to the current request's profile."""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_start_time"].pop()
+        profile = _current_profile.get()
+        if profile is not None:
+            profile.db_time += time.perf_counter() - started
+            profile.query_count += 1
+            profile.statements[statement] += 1
+
+
+@contextmanager
+def serialization_timer():
+    """Add the time spent in the block to the current request's serialization time."""
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.serialization_time += time.perf_counter() - started
+
+
+class ProfilingMiddleware:
+    """ASGI middleware recording latency and per-request database usage by route."""
+
+    def __init__(self, app, registry: ProfilingRegistry = registry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile()
+        token = _current_profile.set(profile)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            duration = time.perf_counter() - started
+            _current_profile.reset(token)
+            # FastAPI stores the matched route in the scope; mounts and 404s are grouped
+            route = getattr(scope.get("route"), "path", None) or "<unmatched>"
+            self.registry.record(scope["method"], route, duration, profile)
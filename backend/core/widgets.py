@@ -574,18 +574,8 @@ class ZipUploadWidget(TextInput):
                     formData.append('slug', slug);
                     
                     try {{
-                        // Upload and extract
-                        const response = await fetch('/admin/api/upload-zip', {{
-                            method: 'POST',
-                            body: formData
-                        }});
-                        
-                        if (!response.ok) {{
-                            const error = await response.json();
-                            throw new Error(error.detail || 'Upload failed');
-                        }}
-                        
-                        const result = await response.json();
+                        // Upload and extract, following real progress events
+                        const result = await uploadZip_{field_id}(formData, slug);
                         
                         // Update hidden input with path
                         document.getElementById('{field_id}').value = result.path;
@@ -607,13 +597,70 @@ class ZipUploadWidget(TextInput):
                     }}
                 }}
                 
+                function uploadZip_{field_id}(formData, slug) {{
+                    // XHR instead of fetch: it reports upload progress and exposes
+                    // the NDJSON progress stream while it is still arriving
+                    return new Promise((resolve, reject) => {{
+                        const xhr = new XMLHttpRequest();
+                        let parsed = 0;
+                        let result = null;
+                        
+                        const handleEvent = (event) => {{
+                            if (event.stage === 'extracting' && event.total) {{
+                                const percent = 50 + Math.round(40 * event.done / event.total);
+                                updateProgress_{field_id}(percent, 'Extracting...');
+                            }} else if (event.stage === 'compressing' && event.total) {{
+                                const percent = 90 + Math.round(9 * event.done / event.total);
+                                updateProgress_{field_id}(percent, 'Compressing...');
+                            }} else if (event.stage === 'validating') {{
+                                updateProgress_{field_id}(50, 'Validating...');
+                            }} else if (event.stage === 'done') {{
+                                result = event;
+                            }} else if (event.stage === 'error') {{
+                                reject(new Error(event.detail || 'Upload failed'));
+                            }}
+                        }};
+                        
+                        const readEvents = () => {{
+                            const text = xhr.responseText;
+                            let newline;
+                            while ((newline = text.indexOf('\\n', parsed)) !== -1) {{
+                                const line = text.slice(parsed, newline).trim();
+                                parsed = newline + 1;
+                                if (line) handleEvent(JSON.parse(line));
+                            }}
+                        }};
+                        
+                        xhr.open('POST', '/admin/api/upload-zip?slug=' + encodeURIComponent(slug));
+                        xhr.setRequestHeader('Accept', 'application/x-ndjson');
+                        
+                        xhr.upload.onprogress = (e) => {{
+                            if (e.lengthComputable) {{
+                                updateProgress_{field_id}(Math.round(50 * e.loaded / e.total), 'Uploading...');
+                            }}
+                        }};
+                        xhr.onprogress = () => {{
+                            if (xhr.status === 200) readEvents();
+                        }};
+                        xhr.onload = () => {{
+                            if (xhr.status !== 200) {{
+                                let detail = 'Upload failed';
+                                try {{ detail = JSON.parse(xhr.responseText).detail || detail; }} catch (e) {{}}
+                                reject(new Error(detail));
+                                return;
+                            }}
+                            readEvents();
+                            if (result) resolve(result);
+                            else reject(new Error('Upload failed'));
+                        }};
+                        xhr.onerror = () => reject(new Error('Upload failed'));
+                        xhr.send(formData);
+                    }});
+                }}
+                
                 function showProgress_{field_id}() {{
                     document.getElementById('progress_container_{field_id}').style.display = 'block';
-                    updateProgress_{field_id}(30, 'Uploading...');
-                    
-                    // Simulate progress
-                    setTimeout(() => updateProgress_{field_id}(60, 'Extracting...'), 500);
-                    setTimeout(() => updateProgress_{field_id}(90, 'Validating...'), 1000);
+                    updateProgress_{field_id}(0, 'Uploading...');
                 }}
                 
                 function hideProgress_{field_id}() {{
@@ -0,0 +1,176 @@
+"""
+Materialized counters for the admin dashboard.
+
+The values live in the ``dashboard_counters`` table and are adjusted inside the
+same transaction as the write that changes them:
+
+- ORM inserts, updates and deletes of projects, gallery images and messages
+  (repositories, sqladmin views) are picked up by the mapper events below;
+- Core/bulk inserts that bypass the ORM unit of work call ``bump_statement()``.
+
+``reconcile()`` recomputes every counter from the source tables. It seeds the
+table on startup and runs periodically to repair any drift.
+"""
+import logging
+from collections import Counter
+from typing import Dict, Mapping
+
+from sqlalchemy import case, event, func, inspect, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import DashboardCounter, GalleryImage, Message, Project
+
+logger = logging.getLogger(__name__)
+
+COUNTER_NAMES = (
+    "projects_total", "projects_live", "projects_draft",
+    "projects_static", "projects_external",
+    "gallery_total", "gallery_linked",
+    "messages_total", "messages_unread",
+)
+
+
+# ============== Per-row contributions ==============
+
+def project_counters(status, project_type) -> Counter:
+    counters = Counter(projects_total=1)
+    if status in ("live", "draft"):
+        counters[f"projects_{status}"] += 1
+    if project_type in ("static", "external"):
+        counters[f"projects_{project_type}"] += 1
+    return counters
+
+
+def gallery_counters(project_id) -> Counter:
+    counters = Counter(gallery_total=1)
+    if project_id is not None:
+        counters["gallery_linked"] += 1
+    return counters
+
+
+def message_counters(is_read) -> Counter:
+    counters = Counter(messages_total=1)
+    if not is_read:
+        counters["messages_unread"] += 1
+    return counters
+
+
+def bump_statement(deltas: Mapping[str, int]):
+    """Single UPDATE adding each delta to its counter, or None if there is nothing to change."""
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return None
+    return (
+        update(DashboardCounter)
+        .where(DashboardCounter.name.in_(deltas))
+        .values(value=DashboardCounter.value + case(deltas, value=DashboardCounter.name, else_=0))
+        .execution_options(synchronize_session=False)
+    )
+
+
+# ============== Mapper events ==============
+
+_TRACKED = {
+    Project: (("status", "project_type"), project_counters),
+    GalleryImage: (("project_id",), gallery_counters),
+    Message: (("is_read",), message_counters),
+}
+
+
+def _current_values(target, fields):
+    return [getattr(target, field) for field in fields]
+
+
+def _previous_values(target, fields):
+    state = inspect(target)
+    values = []
+    for field in fields:
+        history = state.attrs[field].history
+        values.append(history.deleted[0] if history.deleted else getattr(target, field))
+    return values
+
+
+def _apply(connection, deltas: Counter) -> None:
+    stmt = bump_statement(deltas)
+    if stmt is not None:
+        connection.execute(stmt)
+
+
+def _register(model, fields, contribution) -> None:
+    @event.listens_for(model, "after_insert")
+    def after_insert(mapper, connection, target):
+        _apply(connection, contribution(*_current_values(target, fields)))
+
+    @event.listens_for(model, "after_delete")
+    def after_delete(mapper, connection, target):
+        deltas = Counter()
+        deltas.subtract(contribution(*_current_values(target, fields)))
+        _apply(connection, deltas)
+
+    @event.listens_for(model, "after_update")
+    def after_update(mapper, connection, target):
+        deltas = contribution(*_current_values(target, fields))
+        deltas.subtract(contribution(*_previous_values(target, fields)))
+        _apply(connection, deltas)
+
+
+for _model, (_fields, _contribution) in _TRACKED.items():
+    _register(_model, _fields, _contribution)
+
+
+# ============== Reads and reconciliation ==============
+
+async def read_counters(db: AsyncSession) -> Dict[str, int]:
+    result = await db.execute(select(DashboardCounter.name, DashboardCounter.value))
+    values = dict.fromkeys(COUNTER_NAMES, 0)
+    values.update(result.tuples().all())
+    return values
+
+
+def counter_queries() -> Dict[str, object]:
+    """Scalar subquery counting each counter's value from the source tables."""
+    def count(model, *conditions):
+        return select(func.count()).select_from(model).where(*conditions).scalar_subquery()
+
+    return {
+        "projects_total": count(Project),
+        "projects_live": count(Project, Project.status == 'live'),
+        "projects_draft": count(Project, Project.status == 'draft'),
+        "projects_static": count(Project, Project.project_type == 'static'),
+        "projects_external": count(Project, Project.project_type == 'external'),
+        "gallery_total": count(GalleryImage),
+        "gallery_linked": count(GalleryImage, GalleryImage.project_id.isnot(None)),
+        "messages_total": count(Message),
+        "messages_unread": count(Message, Message.is_read == False),
+    }
+
+
+async def reconcile(db: AsyncSession) -> Dict[str, int]:
+    """
+    Overwrite the stored counters with freshly computed values.
+
+    The counts are taken inside the UPDATE itself, with the counter rows
+    locked first on Postgres (SQLite serializes writers anyway). A write that
+    bumps a counter concurrently either commits before the counts are taken
+    and is included in them, or waits for the lock and is applied on top;
+    it is never overwritten by a count that missed it.
+    """
+    dialect_insert = pg_insert if db.bind.dialect.name == "postgresql" else sqlite_insert
+    await db.execute(
+        dialect_insert(DashboardCounter).on_conflict_do_nothing(index_elements=[DashboardCounter.name]),
+        [{"name": name, "value": 0} for name in COUNTER_NAMES]
+    )
+    await db.execute(
+        select(DashboardCounter.name).order_by(DashboardCounter.name).with_for_update()
+    )
+    await db.execute(
+        update(DashboardCounter)
+        .where(DashboardCounter.name.in_(COUNTER_NAMES))
+        .values(value=case(counter_queries(), value=DashboardCounter.name, else_=DashboardCounter.value))
+        .execution_options(synchronize_session=False)
+    )
+    values = await read_counters(db)
+    await db.commit()
+    return values
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from db.session import Base
@@ -109,3 +109,63 @@ class Settings(Base):
 
     def __str__(self):
         return self.key
+
+
+class DashboardCounter(Base):
+    """Materialized counter for the admin dashboard, maintained by db/counters.py."""
+    __tablename__ = "dashboard_counters"
+
+    name = Column(String(50), primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+    def __str__(self):
+        return f"{self.name} = {self.value}"
+
+
+class Blob(Base):
+    """Content-addressed file in the blob store (services/blobs.py)."""
+    __tablename__ = "blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(Integer, nullable=False)
+    # Number of BlobRef rows pointing at this blob
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.ref_count} refs)"
+
+
+class BlobRef(Base):
+    """Public file (in uploads/ or a static project build) materialized from a blob."""
+    __tablename__ = "blob_refs"
+
+    path = Column(String(500), primary_key=True)
+    sha256 = Column(String(64), ForeignKey('blobs.sha256'), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __str__(self):
+        return self.path
+
+
+class Upload(Base):
+    """Index of the files in uploads/, kept in sync by services/uploads.py."""
+    __tablename__ = "uploads"
+
+    filename = Column(String(255), primary_key=True)
+    size = Column(Integer, nullable=False)
+    mime_type = Column(String(100), nullable=False)
+    # NULL for formats without raster dimensions (SVG) or unreadable files
+    width = Column(Integer)
+    height = Column(Integer)
+    sha256 = Column(String(64), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    # Keyset pagination: every sort key is paired with the primary key
+    __table_args__ = (
+        Index("ix_uploads_created_at_filename", "created_at", "filename"),
+        Index("ix_uploads_size_filename", "size", "filename"),
+    )
+
+    def __str__(self):
+        return self.filename
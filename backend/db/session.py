@@ -1,18 +1,154 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+"""
+Async engine and session factory.
+
+The engine is configured per dialect from ``core/config.Settings``:
+
+- PostgreSQL (asyncpg): a per-worker pool sized for gunicorn's worker count
+  (``DB_POOL_SIZE`` + ``DB_MAX_OVERFLOW`` connections each), pre-ping and
+  recycling so connections dropped by the server or a proxy are replaced,
+  and asyncpg's server-side prepared statement caches.
+- SQLite (aiosqlite): PRAGMAs applied on every new connection. WAL lets
+  readers run while a write is in progress; ``synchronous=NORMAL`` is
+  durable in WAL mode except on power loss. Connections are pooled (the
+  aiosqlite default is to open one per session), so the page cache and
+  memory map set by the PRAGMAs survive between requests.
+
+Public read endpoints use a second, read-only engine (``get_read_db``) with
+its own pool, so they never queue behind admin or contact form writes for a
+connection. It points at ``DATABASE_READ_URL`` (a Postgres replica) when set,
+otherwise at the primary database opened read-only: a ``mode=ro`` URI on
+SQLite, ``default_transaction_read_only`` on Postgres. Read sessions run in
+autocommit mode, so no BEGIN/COMMIT is issued around their queries.
+"""
+import logging
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from core.config import settings
 
-if settings.DATABASE_URL.startswith("postgres"):
-    DATABASE_URL = settings.DATABASE_URL.replace("postgres://", "postgresql+asyncpg://")
-elif settings.DATABASE_URL.startswith("sqlite:///"):
-    DATABASE_URL = settings.DATABASE_URL.replace("sqlite:///", "sqlite+aiosqlite:///")
-else:
-    DATABASE_URL = "sqlite+aiosqlite:///portfolio.db"
+logger = logging.getLogger(__name__)
+
+
+def normalize_url(url: str) -> str:
+    """Map configured URLs onto the async drivers."""
+    if url.startswith("postgres"):
+        return url.replace("postgres://", "postgresql+asyncpg://")
+    if url.startswith("sqlite:///"):
+        return url.replace("sqlite:///", "sqlite+aiosqlite:///")
+    return "sqlite+aiosqlite:///portfolio.db"
+
+
+def read_only_url(url: str) -> Optional[str]:
+    """
+    URL of a read-only connection to the same database, or None if the
+    database cannot be opened separately (in-memory SQLite).
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite":
+        return url
+    if not parsed.database or parsed.database == ":memory:":
+        return None
+    return parsed.set(
+        database=f"file:{parsed.database}",
+        query={"mode": "ro", "uri": "true"},
+    ).render_as_string(hide_password=False)
+
+
+DATABASE_URL = normalize_url(settings.DATABASE_URL)
+
+# Reported back by engine_summary() after being read from the database
+SQLITE_PRAGMAS = ("journal_mode", "synchronous", "mmap_size", "cache_size", "busy_timeout")
+
 
-engine = create_async_engine(DATABASE_URL, echo=settings.DEBUG)
+def engine_options(url: str) -> Dict[str, Any]:
+    """Keyword arguments for ``create_async_engine`` for the URL's dialect."""
+    options: Dict[str, Any] = {"echo": settings.DEBUG}
+    if url.startswith("postgresql"):
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+            connect_args={
+                # asyncpg's own cache of prepared statements per connection
+                "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            },
+        )
+    elif url.startswith("sqlite") and ":memory:" not in url:
+        options.update(
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+        )
+    return options
+
+
+def install_sqlite_pragmas(engine: AsyncEngine, read_only: bool = False) -> None:
+    """Apply the SQLite PRAGMAs to every connection the pool opens."""
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # The journal mode is stored in the database file; only the writer sets it
+        if not read_only:
+            cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+        cursor.execute(f"PRAGMA cache_size={int(settings.SQLITE_CACHE_SIZE)}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+        cursor.close()
+
+
+def build_engine(url: str, read_only: bool = False) -> AsyncEngine:
+    options = engine_options(url)
+    if url.startswith("postgresql"):
+        # SQLAlchemy's adapter keeps its own LRU of asyncpg prepared statements
+        separator = "&" if "?" in url else "?"
+        url = f"{url}{separator}prepared_statement_cache_size={settings.DB_PREPARED_STATEMENT_CACHE_SIZE}"
+        if read_only:
+            options["connect_args"]["server_settings"] = {"default_transaction_read_only": "on"}
+    if read_only:
+        options["isolation_level"] = "AUTOCOMMIT"
+    created = create_async_engine(url, **options)
+    if created.dialect.name == "sqlite":
+        install_sqlite_pragmas(created, read_only)
+    return created
+
+
+engine = build_engine(DATABASE_URL)
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+_read_url = normalize_url(settings.DATABASE_READ_URL) if settings.DATABASE_READ_URL else read_only_url(DATABASE_URL)
+# Without a separate read URL (in-memory SQLite) reads share the primary engine
+read_engine = build_engine(_read_url, read_only=True) if _read_url else engine
+async_read_session = async_sessionmaker(read_engine, class_=AsyncSession, expire_on_commit=False)
+
+
+async def engine_summary(target: AsyncEngine = engine) -> Dict[str, Any]:
+    """Effective engine settings, for the startup log."""
+    summary: Dict[str, Any] = {"dialect": target.dialect.name, "pool": target.pool.status()}
+    if target.dialect.name == "sqlite":
+        async with target.connect() as conn:
+            for pragma in SQLITE_PRAGMAS:
+                summary[pragma] = (await conn.execute(text(f"PRAGMA {pragma}"))).scalar()
+    elif target.dialect.name == "postgresql":
+        summary.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+            statement_cache_size=settings.DB_STATEMENT_CACHE_SIZE,
+            prepared_statement_cache_size=settings.DB_PREPARED_STATEMENT_CACHE_SIZE,
+        )
+    return summary
+
 
 class Base(DeclarativeBase):
     pass
@@ -22,3 +158,8 @@ async def get_db():
     async with async_session() as session:
         yield session
 
+
+async def get_read_db():
+    """Session on the read-only engine, for endpoints that never write."""
+    async with async_read_session() as session:
+        yield session
@@ -1,6 +1,6 @@
 from fastapi import Depends
 from sqlalchemy.ext.asyncio import AsyncSession
-from db.session import get_db
+from db.session import get_db, get_read_db
 
 from repositories.projects import ProjectRepository
 from repositories.skills import SkillRepository
@@ -19,8 +19,15 @@ def get_project_repository(db: AsyncSession = Depends(get_db)) -> ProjectReposit
 def get_project_service(repo: ProjectRepository = Depends(get_project_repository)) -> ProjectService:
     return ProjectService(repo)
 
+# Public GETs go through the read-only engine
+def get_project_read_repository(db: AsyncSession = Depends(get_read_db)) -> ProjectRepository:
+    return ProjectRepository(db)
+
+def get_project_read_service(repo: ProjectRepository = Depends(get_project_read_repository)) -> ProjectService:
+    return ProjectService(repo)
+
 # Skills
-def get_skill_repository(db: AsyncSession = Depends(get_db)) -> SkillRepository:
+def get_skill_repository(db: AsyncSession = Depends(get_read_db)) -> SkillRepository:
     return SkillRepository(db)
 
 def get_skill_service(repo: SkillRepository = Depends(get_skill_repository)) -> SkillService:
@@ -34,7 +41,7 @@ def get_message_service(repo: MessageRepository = Depends(get_message_repository
     return MessageService(repo)
 
 # Settings
-def get_settings_repository(db: AsyncSession = Depends(get_db)) -> SettingsRepository:
+def get_settings_repository(db: AsyncSession = Depends(get_read_db)) -> SettingsRepository:
     return SettingsRepository(db)
 
 def get_settings_service(repo: SettingsRepository = Depends(get_settings_repository)) -> SettingsService:
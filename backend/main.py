@@ -1,23 +1,31 @@
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from starlette.middleware.sessions import SessionMiddleware
 
 from core.config import settings
-from db.session import engine
+from db.session import engine, read_engine, async_session, engine_summary
 from db.models import Base, Project, Skill, Message, Settings
+from db import counters
 from core.admin import setup_admin
+from core.profiling import ProfilingMiddleware, install_query_hooks
+from services import images
+from services.messages import message_queue
+from services.uploads import backfill_upload_index
 
 from routing.projects import router as projects_router
 from routing.skills import router as skills_router
 from routing.messages import router as messages_router
 from routing.settings import router as settings_router
-from routing.uploads import router as uploads_router
+from routing.uploads import router as uploads_router, UploadStaticFiles
 from routing.admin_api import router as admin_api_router
+from routing.static_projects import router as static_projects_router
 
 UPLOAD_DIR = Path("uploads")
 UPLOAD_DIR.mkdir(exist_ok=True)
@@ -35,14 +43,54 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+async def reconcile_counters_periodically(interval: int):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with async_session() as session:
+                await counters.reconcile(session)
+        except Exception:
+            logger.exception("Dashboard counter reconciliation failed")
+
+
+async def index_existing_uploads():
+    try:
+        async with async_session() as session:
+            await backfill_upload_index(session)
+    except Exception:
+        logger.exception("Upload index backfill failed")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Ensure tables are created (simplistic migration strategy)
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+    logger.info("Database engine: " + ", ".join(f"{k}={v}" for k, v in (await engine_summary()).items()))
+    if read_engine is not engine:
+        summary = await engine_summary(read_engine)
+        logger.info("Read-only engine: " + ", ".join(f"{k}={v}" for k, v in summary.items()))
+    # Seed the dashboard counters and keep repairing drift in the background
+    async with async_session() as session:
+        await counters.reconcile(session)
+    reconcile_task = None
+    if settings.COUNTERS_RECONCILE_INTERVAL > 0:
+        reconcile_task = asyncio.create_task(
+            reconcile_counters_periodically(settings.COUNTERS_RECONCILE_INTERVAL)
+        )
+    # Files uploaded before the index existed; runs once, off the startup path
+    backfill_task = asyncio.create_task(index_existing_uploads())
+    message_queue.start()
     logger.info("🚀 Application started")
     yield
+    if reconcile_task:
+        reconcile_task.cancel()
+    backfill_task.cancel()
+    # Flush contact messages that were acknowledged but not yet written
+    await message_queue.stop()
+    images.shutdown()
     await engine.dispose()
+    await read_engine.dispose()
     logger.info("👋 Application shutdown")
 
 
@@ -51,6 +99,8 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs" if settings.DEBUG else None,
     redoc_url="/redoc" if settings.DEBUG else None,
+    # orjson for every response the routers don't build themselves
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -61,7 +111,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Last-Modified"],
 )
+if settings.PROFILING_ENABLED:
+    install_query_hooks(engine)
+    if read_engine is not engine:
+        install_query_hooks(read_engine)
+    app.add_middleware(ProfilingMiddleware)
 
 # Register API routers BEFORE static mounts (order matters in FastAPI)
 app.include_router(admin_api_router)  # Must be before static mounts
@@ -70,12 +126,12 @@ app.include_router(skills_router)
 app.include_router(messages_router)
 app.include_router(settings_router)
 app.include_router(uploads_router)
+app.include_router(static_projects_router)
 
 setup_admin(app, engine)
 
 # Static file mounts should be AFTER API routers
-app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
-app.mount("/static-projects", StaticFiles(directory=STATIC_PROJECTS_DIR), name="static-projects")
+app.mount("/uploads", UploadStaticFiles(directory=UPLOAD_DIR), name="uploads")
 app.mount("/static/admin", StaticFiles(directory=STATIC_ADMIN_DIR), name="static-admin")
 
 @app.get("/health")
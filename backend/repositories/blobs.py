@@ -0,0 +1,105 @@
+from collections import Counter
+from typing import Iterable, List, Set, Tuple
+
+from sqlalchemy import case, delete, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import Blob, BlobRef
+
+
+class BlobRepository:
+    """
+    Reference counts for the blob store.
+
+    Methods only execute statements; the caller commits, so references can be
+    recorded in the same transaction as the rows that use the files.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def add_refs(self, refs: Iterable[Tuple[str, str, int]]) -> None:
+        """
+        Record public paths materialized from blobs. Paths that are already
+        recorded (content-addressed names uploaded again) are left as they are.
+
+        Args:
+            refs: (path, sha256, size) for every new public file
+        """
+        refs = {path: (sha256, size) for path, sha256, size in refs}
+        if not refs:
+            return
+
+        sizes = {sha256: size for sha256, size in refs.values()}
+        dialect_insert = pg_insert if self.db.bind.dialect.name == "postgresql" else sqlite_insert
+        # Another worker may register the same content concurrently
+        await self.db.execute(
+            dialect_insert(Blob).on_conflict_do_nothing(index_elements=[Blob.sha256]),
+            [{"sha256": sha256, "size": size, "ref_count": 0} for sha256, size in sizes.items()]
+        )
+        inserted = (await self.db.execute(
+            dialect_insert(BlobRef)
+            .on_conflict_do_nothing(index_elements=[BlobRef.path])
+            .returning(BlobRef.sha256),
+            [{"path": path, "sha256": sha256} for path, (sha256, _) in refs.items()]
+        )).scalars().all()
+        if inserted:
+            await self._adjust(Counter(inserted))
+
+    async def release(self, paths: Iterable[str] = (), prefixes: Iterable[str] = ()) -> List[str]:
+        """
+        Drop the references of deleted public files.
+
+        Args:
+            paths: Exact public paths
+            prefixes: Directories whose files were all deleted
+
+        Returns:
+            Digests of blobs that lost their last reference; their rows are
+            deleted and their files should be removed after commit
+        """
+        conditions = []
+        paths = list(paths)
+        if paths:
+            conditions.append(BlobRef.path.in_(paths))
+        conditions.extend(
+            BlobRef.path.startswith(prefix.rstrip("/") + "/", autoescape=True) for prefix in prefixes
+        )
+        if not conditions:
+            return []
+
+        released = (await self.db.execute(
+            delete(BlobRef).where(or_(*conditions)).returning(BlobRef.sha256)
+        )).scalars().all()
+        if not released:
+            return []
+
+        counts = Counter(released)
+        await self._adjust({sha256: -count for sha256, count in counts.items()})
+        orphaned = await self.db.execute(
+            delete(Blob)
+            .where(Blob.sha256.in_(counts), Blob.ref_count <= 0)
+            .returning(Blob.sha256)
+        )
+        return orphaned.scalars().all()
+
+    async def existing(self, digests: Iterable[str]) -> Set[str]:
+        """Subset of ``digests`` that have a blob row (at least one committed reference)."""
+        result = await self.db.execute(select(Blob.sha256).where(Blob.sha256.in_(list(digests))))
+        return set(result.scalars())
+
+    async def referenced_paths(self, paths: Iterable[str]) -> Set[str]:
+        """Subset of ``paths`` that have a recorded reference."""
+        result = await self.db.execute(select(BlobRef.path).where(BlobRef.path.in_(list(paths))))
+        return set(result.scalars())
+
+    async def _adjust(self, deltas) -> None:
+        # Single UPDATE applying every delta, same pattern as the dashboard counters
+        await self.db.execute(
+            update(Blob)
+            .where(Blob.sha256.in_(deltas))
+            .values(ref_count=Blob.ref_count + case(dict(deltas), value=Blob.sha256, else_=0))
+            .execution_options(synchronize_session=False)
+        )
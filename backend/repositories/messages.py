@@ -1,4 +1,7 @@
+from typing import List
+from sqlalchemy import insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from db.counters import bump_statement
 from db.models import Message
 from schemas.messages import MessageCreate
 
@@ -18,3 +21,16 @@ class MessageRepository:
         # await self.db.refresh(db_message) # Not strictly needed if we don't return generated fields immediately unless requested
         return db_message
 
+
+    async def create_many(self, messages: List[MessageCreate]) -> int:
+        """Insert a batch of messages with one multi-row INSERT."""
+        if not messages:
+            return 0
+        await self.db.execute(insert(Message), [msg.model_dump() for msg in messages])
+        # Bulk inserts bypass the ORM events that maintain the dashboard counters
+        await self.db.execute(bump_statement({
+            "messages_total": len(messages),
+            "messages_unread": len(messages),
+        }))
+        await self.db.commit()
+        return len(messages)
@@ -1,8 +1,26 @@
 from typing import List, Optional
-from sqlalchemy import select, delete
+from sqlalchemy import Row, bindparam, select, delete, update, case
 from sqlalchemy.ext.asyncio import AsyncSession
 from db.models import Project
-from schemas.projects import ProjectCreate, ProjectUpdate
+from schemas.projects import ProjectCreate, ProjectUpdate, ProjectOut
+
+# Hot-path statements are built once; values are passed as bound parameters,
+# so each call reuses the statement's memoized cache key and compiled SQL
+_ALL_PROJECTS = select(Project).order_by(Project.order)
+_FEATURED_PROJECTS = _ALL_PROJECTS.where(Project.is_featured == True)
+_PROJECT_BY_ID = select(Project).where(Project.id == bindparam("project_id"))
+_PROJECT_BY_SLUG = select(Project).where(Project.slug == bindparam("slug"))
+_SLUG_TAKEN = select(Project.id).where(Project.slug == bindparam("slug"))
+_SLUG_TAKEN_BY_OTHER = _SLUG_TAKEN.where(Project.id != bindparam("exclude_id"))
+
+# Public read path: only the columns ProjectOut serializes, as plain rows.
+# Skips ORM hydration and never loads static_content (inline HTML can be
+# hundreds of KB per project).
+OUT_COLUMNS = [getattr(Project, name) for name in ProjectOut.model_fields if name in Project.__table__.columns]
+_ALL_PROJECT_ROWS = select(*OUT_COLUMNS).order_by(Project.order)
+_FEATURED_PROJECT_ROWS = _ALL_PROJECT_ROWS.where(Project.is_featured == True)
+_PROJECT_ROW_BY_ID = select(*OUT_COLUMNS).where(Project.id == bindparam("project_id"))
+_PROJECT_ROW_BY_SLUG = select(*OUT_COLUMNS).where(Project.slug == bindparam("slug"))
 
 
 class ProjectRepository:
@@ -10,25 +28,34 @@ class ProjectRepository:
         self.db = db
 
     async def get_all(self, featured_only: bool = False) -> List[Project]:
-        query = select(Project).order_by(Project.order)
-        if featured_only:
-            query = query.where(Project.is_featured == True)
-        result = await self.db.execute(query)
+        result = await self.db.execute(_FEATURED_PROJECTS if featured_only else _ALL_PROJECTS)
         return result.scalars().all()
 
     async def get_by_id(self, project_id: int) -> Optional[Project]:
-        result = await self.db.execute(select(Project).where(Project.id == project_id))
+        result = await self.db.execute(_PROJECT_BY_ID, {"project_id": project_id})
         return result.scalar_one_or_none()
 
     async def get_by_slug(self, slug: str) -> Optional[Project]:
-        result = await self.db.execute(select(Project).where(Project.slug == slug))
+        result = await self.db.execute(_PROJECT_BY_SLUG, {"slug": slug})
         return result.scalar_one_or_none()
 
+    async def get_all_rows(self, featured_only: bool = False) -> List[Row]:
+        result = await self.db.execute(_FEATURED_PROJECT_ROWS if featured_only else _ALL_PROJECT_ROWS)
+        return result.all()
+
+    async def get_row_by_id(self, project_id: int) -> Optional[Row]:
+        result = await self.db.execute(_PROJECT_ROW_BY_ID, {"project_id": project_id})
+        return result.one_or_none()
+
+    async def get_row_by_slug(self, slug: str) -> Optional[Row]:
+        result = await self.db.execute(_PROJECT_ROW_BY_SLUG, {"slug": slug})
+        return result.one_or_none()
+
     async def slug_exists(self, slug: str, exclude_id: Optional[int] = None) -> bool:
-        query = select(Project.id).where(Project.slug == slug)
         if exclude_id:
-            query = query.where(Project.id != exclude_id)
-        result = await self.db.execute(query)
+            result = await self.db.execute(_SLUG_TAKEN_BY_OTHER, {"slug": slug, "exclude_id": exclude_id})
+        else:
+            result = await self.db.execute(_SLUG_TAKEN, {"slug": slug})
         return result.scalar_one_or_none() is not None
 
     async def create(self, data: ProjectCreate) -> Project:
@@ -57,3 +84,59 @@ class ProjectRepository:
         await self.db.commit()
         return True
 
+
+    async def reorder(self, project_ids: List[int]) -> List[int]:
+        """
+        Set each project's order to its position in ``project_ids`` with one
+        validation query and one set-based UPDATE. Nothing is written if any
+        id is unknown; the missing ids are returned instead.
+        """
+        result = await self.db.execute(select(Project.id).where(Project.id.in_(project_ids)))
+        existing = set(result.scalars())
+        missing = [pid for pid in project_ids if pid not in existing]
+        if missing:
+            return missing
+        await self._apply_order({pid: idx for idx, pid in enumerate(project_ids)})
+        await self.db.commit()
+        return []
+
+    async def move(
+        self,
+        project_id: int,
+        before_id: Optional[int] = None,
+        after_id: Optional[int] = None,
+    ) -> Optional[int]:
+        """
+        Move one project directly before ``before_id`` or after ``after_id`` in
+        the catalog order. Only rows whose position changes are updated.
+        Returns the id that does not exist, or None on success.
+        """
+        result = await self.db.execute(
+            select(Project.id, Project.order).order_by(Project.order, Project.id)
+        )
+        rows = result.all()
+        ids = [row.id for row in rows]
+        neighbour_id = before_id if before_id is not None else after_id
+        for pid in (project_id, neighbour_id):
+            if pid not in ids:
+                return pid
+        ids.remove(project_id)
+        target = ids.index(neighbour_id) + (0 if before_id is not None else 1)
+        ids.insert(target, project_id)
+
+        old_order = {row.id: row.order for row in rows}
+        await self._apply_order({
+            pid: idx for idx, pid in enumerate(ids) if old_order[pid] != idx
+        })
+        await self.db.commit()
+        return None
+
+    async def _apply_order(self, positions: dict) -> None:
+        if not positions:
+            return
+        await self.db.execute(
+            update(Project)
+            .where(Project.id.in_(positions))
+            .values(order=case(positions, value=Project.id))
+            .execution_options(synchronize_session=False)
+        )
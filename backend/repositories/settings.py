@@ -1,13 +1,15 @@
 from typing import Optional
-from sqlalchemy import select
+from sqlalchemy import bindparam, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from db.models import Settings as SettingsModel
 
+# Built once and reused with bound parameters (see repositories/projects.py)
+_SETTING_BY_KEY = select(SettingsModel).where(SettingsModel.key == bindparam("key"))
+
 class SettingsRepository:
     def __init__(self, db: AsyncSession):
         self.db = db
 
     async def get_by_key(self, key: str) -> Optional[SettingsModel]:
-        result = await self.db.execute(select(SettingsModel).where(SettingsModel.key == key))
+        result = await self.db.execute(_SETTING_BY_KEY, {"key": key})
         return result.scalar_one_or_none()
-
@@ -1,16 +1,32 @@
 from typing import List, Optional
-from sqlalchemy import select
+from sqlalchemy import Row, bindparam, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from db.models import Skill
+from schemas.skills import SkillOut
+
+# Built once and reused with bound parameters (see repositories/projects.py)
+_ALL_SKILLS = select(Skill).order_by(Skill.order)
+_SKILLS_IN_CATEGORY = _ALL_SKILLS.where(Skill.category == bindparam("category"))
+
+# Public read path: the SkillOut columns as plain rows, no ORM hydration
+OUT_COLUMNS = [getattr(Skill, name) for name in SkillOut.model_fields]
+_ALL_SKILL_ROWS = select(*OUT_COLUMNS).order_by(Skill.order)
+_SKILL_ROWS_IN_CATEGORY = _ALL_SKILL_ROWS.where(Skill.category == bindparam("category"))
 
 class SkillRepository:
     def __init__(self, db: AsyncSession):
         self.db = db
 
     async def get_all(self, category: Optional[str] = None) -> List[Skill]:
-        query = select(Skill).order_by(Skill.order)
         if category:
-            query = query.where(Skill.category == category)
-        result = await self.db.execute(query)
+            result = await self.db.execute(_SKILLS_IN_CATEGORY, {"category": category})
+        else:
+            result = await self.db.execute(_ALL_SKILLS)
         return result.scalars().all()
 
+    async def get_all_rows(self, category: Optional[str] = None) -> List[Row]:
+        if category:
+            result = await self.db.execute(_SKILL_ROWS_IN_CATEGORY, {"category": category})
+        else:
+            result = await self.db.execute(_ALL_SKILL_ROWS)
+        return result.all()
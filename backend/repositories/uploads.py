@@ -0,0 +1,135 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Iterable, List, NamedTuple, Optional
+
+from sqlalchemy import delete, exists, func, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import Upload
+
+# Columns the listing can be sorted by; each is paired with the primary key
+SORT_COLUMNS = {
+    "created_at": Upload.created_at,
+    "size": Upload.size,
+    "filename": Upload.filename,
+}
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+    pass
+
+
+class UploadPage(NamedTuple):
+    items: List[Upload]
+    next_cursor: Optional[str]
+    total: int
+
+
+def encode_cursor(upload: Upload, sort: str) -> str:
+    value = getattr(upload, sort)
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([value, upload.filename]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, filename = json.loads(raw)
+        if sort == "created_at":
+            value = datetime.fromisoformat(value)
+        elif sort == "size" and not isinstance(value, int):
+            raise ValueError(value)
+    except (binascii.Error, ValueError, TypeError):
+        raise InvalidCursorError(cursor)
+    return value, filename
+
+
+class UploadRepository:
+    """
+    Index of uploaded files. Methods only execute statements; the caller
+    commits, so the index changes together with the blob references.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def add_many(self, rows: Iterable[dict]) -> None:
+        """Index files; names that are already indexed are left as they are."""
+        rows = list(rows)
+        if not rows:
+            return
+        dialect_insert = pg_insert if self.db.bind.dialect.name == "postgresql" else sqlite_insert
+        await self.db.execute(
+            dialect_insert(Upload).on_conflict_do_nothing(index_elements=[Upload.filename]),
+            rows
+        )
+
+    async def delete_many(self, filenames: Iterable[str]) -> None:
+        filenames = list(filenames)
+        if filenames:
+            await self.db.execute(delete(Upload).where(Upload.filename.in_(filenames)))
+
+    async def is_empty(self) -> bool:
+        return not (await self.db.execute(select(exists().select_from(Upload)))).scalar()
+
+    async def get_page(
+        self,
+        sort: str = "created_at",
+        descending: bool = True,
+        cursor: Optional[str] = None,
+        limit: int = 50,
+        search: Optional[str] = None,
+        mime_type: Optional[str] = None,
+    ) -> UploadPage:
+        """
+        One page of the index using keyset pagination.
+
+        Args:
+            sort: Key of ``SORT_COLUMNS``
+            descending: Sort direction
+            cursor: ``next_cursor`` of the previous page
+            limit: Page size
+            search: Substring of the file name
+            mime_type: Exact MIME type
+
+        Returns:
+            Items, cursor of the next page (None on the last page) and the
+            number of files matching the filters
+
+        Raises:
+            InvalidCursorError: If ``cursor`` is malformed
+        """
+        column = SORT_COLUMNS[sort]
+        # Sorting by name already has a unique key
+        key = (column,) if sort == "filename" else (column, Upload.filename)
+
+        filters = []
+        if search:
+            filters.append(Upload.filename.contains(search, autoescape=True))
+        if mime_type:
+            filters.append(Upload.mime_type == mime_type)
+
+        query = select(Upload).where(*filters)
+        if cursor:
+            value, filename = decode_cursor(cursor, sort)
+            position = tuple_(*key) if len(key) > 1 else Upload.filename
+            bound = tuple_(value, filename) if len(key) > 1 else filename
+            query = query.where(position < bound if descending else position > bound)
+        query = query.order_by(*(c.desc() if descending else c.asc() for c in key))
+
+        # One extra row tells whether another page follows
+        rows = (await self.db.execute(query.limit(limit + 1))).scalars().all()
+        items = rows[:limit]
+        next_cursor = encode_cursor(items[-1], sort) if len(rows) > limit else None
+
+        total = (await self.db.execute(
+            select(func.count()).select_from(Upload).where(*filters)
+        )).scalar_one()
+        return UploadPage(items, next_cursor, total)
@@ -2,17 +2,38 @@
 Admin API endpoints for the portfolio admin panel.
 Provides endpoints for project reordering, bulk gallery upload, statistics, and preview.
 """
-from typing import List
+import asyncio
+import json
+from typing import BinaryIO, List, Optional, Set
 from datetime import datetime
+from pathlib import Path
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
-from sqlalchemy import select, func, update
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile, File, Request
+from fastapi.responses import (
+    HTMLResponse, RedirectResponse, JSONResponse, PlainTextResponse, StreamingResponse
+)
+from sqlalchemy import select, func, update, insert, cast, literal, null, union_all, String
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 
-from db.session import get_db
+from core.cache import project_cache
+from core.config import settings
+from core.profiling import registry as profiling_registry
+from db.counters import bump_statement, read_counters
+from db.session import async_session, get_db
 from db.models import Project, GalleryImage, Message
+from repositories.blobs import BlobRepository
+from repositories.projects import ProjectRepository
+from routing.static_projects import static_files
+from services.uploads import (
+    ALLOWED_EXTENSIONS, FileTooLargeError, detach_upload, discard_uploads, register_uploads, save_upload
+)
+from services.blobs import blob_store
+from services.images import generate_derivatives
+from services.zip_extract import (
+    MAX_ZIP_SIZE, BuildNotFoundError, ProgressCallback, ZipExtractService, ZipExtractionError
+)
 
 router = APIRouter(prefix="/admin/api", tags=["admin"])
 
@@ -24,6 +45,24 @@ class ReorderRequest(BaseModel):
     project_ids: List[int]
 
 
+class MoveRequest(BaseModel):
+    """
+    Request body for moving one project next to another one.
+
+    The neighbour is given by id rather than as a number of positions, so the
+    move means the same thing when the list it was made in is filtered,
+    searched or paginated. Exactly one of ``before_id``/``after_id`` is set.
+    """
+    project_id: int
+    before_id: Optional[int] = None
+    after_id: Optional[int] = None
+
+
+class RollbackRequest(BaseModel):
+    """Request body for rolling a static project back to an earlier build."""
+    build_id: Optional[str] = None
+
+
 class ProjectStats(BaseModel):
     """Statistics about projects."""
     total: int
@@ -74,9 +113,17 @@ class GalleryImageOut(BaseModel):
         from_attributes = True
 
 
+# ============== Dependencies ==============
+
+def require_admin(request: Request) -> None:
+    """Allow only requests carrying a logged-in admin session."""
+    if not request.session.get("admin", False):
+        raise HTTPException(status_code=401, detail="Admin authentication required")
+
+
 # ============== Endpoints ==============
 
-@router.put("/reorder")
+@router.put("/reorder", dependencies=[Depends(require_admin)])
 async def reorder_projects(
     request: ReorderRequest,
     db: AsyncSession = Depends(get_db)
@@ -85,7 +132,8 @@ async def reorder_projects(
     Reorder projects by updating their order field.
     
     Accepts a list of project IDs in the desired order.
-    Updates the order field for each project in a transaction.
+    Validates all IDs with one query and rewrites the order field with a
+    single set-based UPDATE, so the cost does not grow in round-trips.
     
     Requirements: 3.3
     """
@@ -95,22 +143,13 @@ async def reorder_projects(
         raise HTTPException(status_code=400, detail="Project IDs list cannot be empty")
     
     try:
-        # Update order for each project in a single transaction
-        for idx, project_id in enumerate(project_ids):
-            result = await db.execute(
-                select(Project).where(Project.id == project_id)
+        missing = await ProjectRepository(db).reorder(project_ids)
+        if missing:
+            raise HTTPException(
+                status_code=404, 
+                detail=f"Project with ID {missing[0]} not found"
             )
-            project = result.scalar_one_or_none()
-            
-            if not project:
-                raise HTTPException(
-                    status_code=404, 
-                    detail=f"Project with ID {project_id} not found"
-                )
-            
-            project.order = idx
-        
-        await db.commit()
+        project_cache.invalidate()
         
         return {"message": "Projects reordered successfully", "count": len(project_ids)}
     
@@ -122,8 +161,47 @@ async def reorder_projects(
         raise HTTPException(status_code=500, detail=f"Failed to reorder projects: {str(e)}")
 
 
+@router.put("/reorder/move", dependencies=[Depends(require_admin)])
+async def move_project(
+    request: MoveRequest,
+    db: AsyncSession = Depends(get_db)
+) -> dict:
+    """
+    Move a single project directly before ``before_id`` or after ``after_id``
+    (drag-and-drop of one row).
+    
+    Requirements: 3.3
+    """
+    neighbour_id = request.before_id if request.before_id is not None else request.after_id
+    if (request.before_id is None) == (request.after_id is None):
+        raise HTTPException(status_code=400, detail="Exactly one of before_id and after_id is required")
+    if neighbour_id == request.project_id:
+        return {"message": "Project order unchanged", "project_id": request.project_id}
+    
+    try:
+        missing = await ProjectRepository(db).move(
+            request.project_id, before_id=request.before_id, after_id=request.after_id
+        )
+        if missing is not None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Project with ID {missing} not found"
+            )
+        project_cache.invalidate()
+        
+        return {"message": "Project moved successfully", "project_id": request.project_id}
+    
+    except HTTPException:
+        await db.rollback()
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to move project: {str(e)}")
+
+
 @router.post("/gallery/bulk")
 async def bulk_upload_gallery(
+    background_tasks: BackgroundTasks,
     files: List[UploadFile] = File(...),
     db: AsyncSession = Depends(get_db)
 ) -> dict:
@@ -131,71 +209,68 @@ async def bulk_upload_gallery(
     Bulk upload images to the gallery.
     
     Accepts multiple image files and creates GalleryImage records for each.
+    Files are written concurrently (up to GALLERY_UPLOAD_CONCURRENCY at a time)
+    and all records are created with a single INSERT ... RETURNING.
     Returns list of created images.
     
     Requirements: 4.2
     """
-    import uuid
-    from pathlib import Path
+    semaphore = asyncio.Semaphore(settings.GALLERY_UPLOAD_CONCURRENCY)
     
-    UPLOAD_DIR = Path("uploads")
-    ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg"}
-    MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
+    async def store(file: UploadFile) -> dict:
+        # Validate file extension
+        ext = Path(file.filename).suffix.lower()
+        if ext not in ALLOWED_EXTENSIONS:
+            return {
+                "filename": file.filename,
+                "error": f"Invalid file type. Allowed: {', '.join(ALLOWED_EXTENSIONS)}"
+            }
+        
+        async with semaphore:
+            try:
+                stored = await save_upload(file)
+            except FileTooLargeError:
+                return {"filename": file.filename, "error": "File too large (max 5MB)"}
+            except Exception as e:
+                return {"filename": file.filename, "error": str(e)}
+        
+        return {
+            "original_name": file.filename,
+            "image_url": f"/uploads/{stored.filename}",
+            "stored": stored
+        }
     
-    created_images = []
-    errors = []
+    results = await asyncio.gather(*(store(file) for file in files))
+    stored = [r for r in results if "image_url" in r]
+    errors = [r for r in results if "error" in r]
     
-    for file in files:
+    created_images = []
+    if stored:
         try:
-            # Validate file extension
-            ext = Path(file.filename).suffix.lower()
-            if ext not in ALLOWED_EXTENSIONS:
-                errors.append({
-                    "filename": file.filename,
-                    "error": f"Invalid file type. Allowed: {', '.join(ALLOWED_EXTENSIONS)}"
-                })
-                continue
-            
-            # Read and validate file size
-            content = await file.read()
-            if len(content) > MAX_FILE_SIZE:
-                errors.append({
-                    "filename": file.filename,
-                    "error": "File too large (max 5MB)"
-                })
-                continue
-            
-            # Generate unique filename and save
-            filename = f"{uuid.uuid4().hex}{ext}"
-            file_path = UPLOAD_DIR / filename
-            
-            with open(file_path, "wb") as f:
-                f.write(content)
-            
-            # Create GalleryImage record
-            image_url = f"/uploads/{filename}"
-            gallery_image = GalleryImage(
-                image_url=image_url,
-                description=None,
-                likes=0,
-                project_id=None
+            result = await db.execute(
+                insert(GalleryImage).returning(GalleryImage.id, sort_by_parameter_order=True),
+                [
+                    {"image_url": r["image_url"], "description": None, "likes": 0, "project_id": None}
+                    for r in stored
+                ]
             )
-            db.add(gallery_image)
-            await db.flush()  # Get the ID
-            
-            created_images.append({
-                "id": gallery_image.id,
-                "image_url": image_url,
-                "original_name": file.filename
-            })
-            
+            ids = result.scalars().all()
+            # Bulk inserts bypass the ORM events that maintain the dashboard counters
+            await db.execute(bump_statement({"gallery_total": len(ids)}))
+            await register_uploads(db, [r["stored"] for r in stored])
+            await db.commit()
         except Exception as e:
-            errors.append({
-                "filename": file.filename,
-                "error": str(e)
-            })
-    
-    await db.commit()
+            await db.rollback()
+            # Don't leave orphaned files behind when the records could not be created
+            await discard_uploads(db, [r["stored"] for r in stored])
+            raise HTTPException(status_code=500, detail=f"Failed to save gallery images: {str(e)}")
+        
+        created_images = [
+            {"id": image_id, "image_url": r["image_url"], "original_name": r["original_name"]}
+            for image_id, r in zip(ids, stored)
+        ]
+        # Thumbnails and WebP/AVIF variants are rendered after the response
+        background_tasks.add_task(generate_derivatives, [r["stored"].filename for r in stored])
     
     return {
         "created": created_images,
@@ -211,113 +286,70 @@ async def get_stats(db: AsyncSession = Depends(get_db)) -> StatsResponse:
     Get statistics about projects, gallery, and messages.
     
     Returns counts and distributions for dashboard display.
+    Counters are read from the materialized dashboard_counters table
+    (see db/counters.py) and the activity feed comes from one UNION ALL query.
     
     Requirements: 7.1, 7.2, 7.3
     """
-    # Project statistics
-    total_projects = await db.execute(select(func.count(Project.id)))
-    total_projects_count = total_projects.scalar() or 0
-    
-    live_projects = await db.execute(
-        select(func.count(Project.id)).where(Project.status == 'live')
-    )
-    live_count = live_projects.scalar() or 0
+    counts = await read_counters(db)
     
-    draft_projects = await db.execute(
-        select(func.count(Project.id)).where(Project.status == 'draft')
-    )
-    draft_count = draft_projects.scalar() or 0
-    
-    static_projects = await db.execute(
-        select(func.count(Project.id)).where(Project.project_type == 'static')
-    )
-    static_count = static_projects.scalar() or 0
-    
-    external_projects = await db.execute(
-        select(func.count(Project.id)).where(Project.project_type == 'external')
-    )
-    external_count = external_projects.scalar() or 0
-    
-    # Gallery statistics
-    total_gallery = await db.execute(select(func.count(GalleryImage.id)))
-    total_gallery_count = total_gallery.scalar() or 0
-    
-    linked_gallery = await db.execute(
-        select(func.count(GalleryImage.id)).where(GalleryImage.project_id.isnot(None))
-    )
-    linked_count = linked_gallery.scalar() or 0
-    
-    standalone_count = total_gallery_count - linked_count
-    
-    # Message statistics
-    total_messages = await db.execute(select(func.count(Message.id)))
-    total_messages_count = total_messages.scalar() or 0
-    
-    unread_messages = await db.execute(
-        select(func.count(Message.id)).where(Message.is_read == False)
+    # Recent activity (last 10 items from projects, gallery, messages)
+    activity = union_all(
+        select(
+            literal("project_created").label("type"),
+            Project.title.label("label"),
+            cast(null(), String).label("detail"),
+            Project.created_at.label("created_at"),
+        ).where(Project.created_at.isnot(None)),
+        select(
+            literal("image_uploaded"),
+            GalleryImage.description,
+            cast(null(), String),
+            GalleryImage.created_at,
+        ).where(GalleryImage.created_at.isnot(None)),
+        select(
+            literal("message_received"),
+            Message.name,
+            Message.subject,
+            Message.created_at,
+        ).where(Message.created_at.isnot(None)),
+    ).subquery()
+    
+    recent_result = await db.execute(
+        select(activity).order_by(activity.c.created_at.desc()).limit(10)
     )
-    unread_count = unread_messages.scalar() or 0
     
-    # Recent activity (last 10 items from projects, gallery, messages)
     recent_activity = []
-    
-    # Recent projects
-    recent_projects_result = await db.execute(
-        select(Project).order_by(Project.created_at.desc()).limit(5)
-    )
-    for project in recent_projects_result.scalars():
-        if project.created_at:
-            recent_activity.append(ActivityItem(
-                type="project_created",
-                description=f"Project '{project.title}' created",
-                timestamp=project.created_at
-            ))
-    
-    # Recent gallery images
-    recent_images_result = await db.execute(
-        select(GalleryImage).order_by(GalleryImage.created_at.desc()).limit(5)
-    )
-    for image in recent_images_result.scalars():
-        if image.created_at:
-            desc = image.description or "No description"
-            recent_activity.append(ActivityItem(
-                type="image_uploaded",
-                description=f"Image uploaded: {desc[:50]}",
-                timestamp=image.created_at
-            ))
-    
-    # Recent messages
-    recent_messages_result = await db.execute(
-        select(Message).order_by(Message.created_at.desc()).limit(5)
-    )
-    for message in recent_messages_result.scalars():
-        if message.created_at:
-            recent_activity.append(ActivityItem(
-                type="message_received",
-                description=f"Message from {message.name}: {message.subject or 'No subject'}",
-                timestamp=message.created_at
-            ))
-    
-    # Sort by timestamp and limit to 10
-    recent_activity.sort(key=lambda x: x.timestamp, reverse=True)
-    recent_activity = recent_activity[:10]
+    for item in recent_result:
+        if item.type == "project_created":
+            description = f"Project '{item.label}' created"
+        elif item.type == "image_uploaded":
+            desc = item.label or "No description"
+            description = f"Image uploaded: {desc[:50]}"
+        else:
+            description = f"Message from {item.label}: {item.detail or 'No subject'}"
+        recent_activity.append(ActivityItem(
+            type=item.type,
+            description=description,
+            timestamp=item.created_at
+        ))
     
     return StatsResponse(
         projects=ProjectStats(
-            total=total_projects_count,
-            live=live_count,
-            draft=draft_count,
-            static_count=static_count,
-            external_count=external_count
+            total=counts["projects_total"],
+            live=counts["projects_live"],
+            draft=counts["projects_draft"],
+            static_count=counts["projects_static"],
+            external_count=counts["projects_external"]
         ),
         gallery=GalleryStats(
-            total=total_gallery_count,
-            linked_to_projects=linked_count,
-            standalone=standalone_count
+            total=counts["gallery_total"],
+            linked_to_projects=counts["gallery_linked"],
+            standalone=counts["gallery_total"] - counts["gallery_linked"]
         ),
         messages=MessageStats(
-            total=total_messages_count,
-            unread=unread_count
+            total=counts["messages_total"],
+            unread=counts["messages_unread"]
         ),
         recent_activity=recent_activity
     )
@@ -325,22 +357,25 @@ async def get_stats(db: AsyncSession = Depends(get_db)) -> StatsResponse:
 
 @router.post("/upload-zip")
 async def upload_zip(
+    request: Request,
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     slug: str = None,
     db: AsyncSession = Depends(get_db)
-) -> dict:
+):
     """
     Upload and extract a ZIP archive for a static project.
     
     Accepts a ZIP file and project slug, extracts to /static-projects/{slug}/
     Returns the path and list of extracted files.
     
+    The archive is read straight from the temp file the multipart parser
+    spooled it into, and validated and extracted in one pass in a worker
+    thread. Clients sending ``Accept: application/x-ndjson`` receive progress
+    events while it runs, followed by the same result as a final event.
+    
     Requirements: 6.1
     """
-    import tempfile
-    from pathlib import Path
-    from services.zip_extract import ZipExtractService, ZipExtractionError
-    
     if not slug:
         raise HTTPException(status_code=400, detail="Project slug is required")
     
@@ -348,35 +383,141 @@ async def upload_zip(
     if not file.filename.lower().endswith('.zip'):
         raise HTTPException(status_code=400, detail="File must be a ZIP archive")
     
+    if file.size is not None and file.size > MAX_ZIP_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"File too large (max {MAX_ZIP_SIZE // 1024 // 1024}MB)"
+        )
+    
+    service = ZipExtractService()
+    archive = await detach_upload(file)
+    # Builds beyond the rollback window are removed once the response is sent
+    background_tasks.add_task(_collect_static_builds, service, slug)
+    
+    if "application/x-ndjson" in request.headers.get("accept", ""):
+        return StreamingResponse(
+            _zip_progress_events(service, archive, slug),
+            media_type="application/x-ndjson"
+        )
+    
     try:
-        # Save uploaded file to temp location
-        content = await file.read()
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.zip') as tmp:
-            tmp.write(content)
-            tmp_path = Path(tmp.name)
-        
-        try:
-            # Extract using ZipExtractService
-            service = ZipExtractService()
-            extracted_path = service.extract_zip(tmp_path, slug)
-            
-            # Get list of extracted files
-            files = service.list_project_files(slug)
-            
-            return {
-                "path": str(extracted_path),
-                "files": files,
-                "message": f"Successfully extracted {len(files)} files"
-            }
-        finally:
-            # Clean up temp file
-            tmp_path.unlink(missing_ok=True)
-            
+        return await _publish_zip(service, archive, slug)
     except ZipExtractionError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to process ZIP: {str(e)}")
+    finally:
+        archive.close()
+
+
+async def _publish_zip(
+    service: ZipExtractService,
+    archive: BinaryIO,
+    slug: str,
+    progress: Optional[ProgressCallback] = None,
+) -> dict:
+    """Publish the archive in a worker thread and record the blobs its files link to."""
+    ingested: Set[str] = set()
+    try:
+        build = await run_in_threadpool(service.publish_zip, archive, slug, progress, ingested)
+        if build.refs:
+            # Own session: with NDJSON the request's session is closed before this runs
+            async with async_session() as session:
+                await BlobRepository(session).add_refs(build.refs)
+                await session.commit()
+    except Exception:
+        # Blobs written for this archive without a committed reference could
+        # never be released; content that was already stored is kept
+        await _discard_blobs(ingested)
+        raise
+    
+    files = await run_in_threadpool(service.list_project_files, slug)
+    return {
+        "path": str(build.path),
+        "files": files,
+        "message": f"Successfully extracted {len(files)} files"
+    }
+
+
+async def _discard_blobs(digests: Set[str]) -> None:
+    if not digests:
+        return
+    async with async_session() as session:
+        known = await BlobRepository(session).existing(digests)
+    await run_in_threadpool(blob_store.remove, digests - known)
+
+
+async def _collect_static_builds(service: ZipExtractService, slug: str) -> None:
+    """Remove builds outside the rollback window and release their blobs."""
+    removed = await run_in_threadpool(service.collect_garbage, slug)
+    if not removed:
+        return
+    async with async_session() as session:
+        orphaned = await BlobRepository(session).release(prefixes=removed)
+        await session.commit()
+    await run_in_threadpool(blob_store.remove, orphaned)
+
+
+async def _zip_progress_events(service: ZipExtractService, archive: BinaryIO, slug: str):
+    """Run the extraction in a worker thread and yield its progress as NDJSON lines."""
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+    
+    def report(stage: str, done: int, total: int) -> None:
+        loop.call_soon_threadsafe(events.put_nowait, {"stage": stage, "done": done, "total": total})
+    
+    task = asyncio.ensure_future(_publish_zip(service, archive, slug, report))
+    # Progress callbacks are queued before the task resolves, so None is always last
+    task.add_done_callback(lambda _: events.put_nowait(None))
+    try:
+        yield json.dumps({"stage": "validating"}) + "\n"
+        while (event := await events.get()) is not None:
+            yield json.dumps(event) + "\n"
+        
+        try:
+            result = task.result()
+        except ZipExtractionError as e:
+            yield json.dumps({"stage": "error", "status": 400, "detail": str(e)}) + "\n"
+        except Exception as e:
+            yield json.dumps(
+                {"stage": "error", "status": 500, "detail": f"Failed to process ZIP: {str(e)}"}
+            ) + "\n"
+        else:
+            yield json.dumps({"stage": "done", **result}) + "\n"
+    finally:
+        # The publish keeps reading the archive if the client went away
+        task.add_done_callback(lambda _: archive.close())
+
+
+@router.get("/static-projects/{slug}/builds", dependencies=[Depends(require_admin)])
+async def list_static_project_builds(slug: str) -> dict:
+    """
+    List the kept builds of a static project, newest first.
+    """
+    service = ZipExtractService()
+    try:
+        builds = await run_in_threadpool(service.list_builds, slug)
+    except ZipExtractionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"slug": slug, "builds": builds}
+
+
+@router.post("/static-projects/{slug}/rollback", dependencies=[Depends(require_admin)])
+async def rollback_static_project(slug: str, body: RollbackRequest) -> dict:
+    """
+    Re-publish an earlier build of a static project.
+    
+    Without a build id the project goes back to the build published
+    before the active one.
+    """
+    service = ZipExtractService()
+    try:
+        build_id = await run_in_threadpool(service.rollback, slug, body.build_id)
+    except BuildNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ZipExtractionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"slug": slug, "active_build": build_id}
 
 
 @router.get("/preview/{project_id}")
@@ -405,12 +546,13 @@ async def preview_project(
         if project.static_content:
             return HTMLResponse(content=project.static_content)
         elif project.static_path:
-            # Try to serve index.html from the static path
-            from pathlib import Path
-            index_path = Path(project.static_path) / "index.html"
-            if index_path.exists():
-                with open(index_path, "r", encoding="utf-8") as f:
-                    return HTMLResponse(content=f.read())
+            # Serve index.html through the static project file cache, read off the event loop
+            resolved = static_files.resolve(Path(project.static_path).name, "index.html")
+            if resolved is not None:
+                content = await static_files.read_cached(*resolved)
+                if content is None:
+                    content = await run_in_threadpool(resolved[0].read_bytes)
+                return HTMLResponse(content=content)
             else:
                 return HTMLResponse(
                     content=f"<html><body><h1>Static project: {project.title}</h1>"
@@ -437,3 +579,19 @@ async def preview_project(
             content=f"<html><body><h1>{project.title}</h1>"
             f"<p>Unknown project type: {project.project_type}</p></body></html>"
         )
+
+
+@router.get("/metrics", dependencies=[Depends(require_admin)])
+async def get_metrics(format: str = "json"):
+    """
+    Per-route latency histograms, DB time, query counts, serialization time
+    and N+1 flags collected by the profiling middleware in this worker.
+    
+    Use ?format=prometheus for the Prometheus text exposition format.
+    """
+    if not settings.PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled (set PROFILING_ENABLED=true)")
+    
+    if format == "prometheus":
+        return PlainTextResponse(profiling_registry.prometheus(), media_type="text/plain; version=0.0.4")
+    return {"routes": profiling_registry.snapshot()}
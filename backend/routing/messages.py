@@ -1,6 +1,6 @@
 import logging
-from fastapi import APIRouter, Depends
-from services.messages import MessageService
+from fastapi import APIRouter, Depends, HTTPException
+from services.messages import MessageService, QueueFullError
 from schemas.messages import MessageCreate
 from depends import get_message_service
 
@@ -12,7 +12,10 @@ async def send_message(
     msg: MessageCreate,
     service: MessageService = Depends(get_message_service)
 ):
-    await service.send_message(msg)
+    try:
+        await service.send_message(msg)
+    except QueueFullError:
+        raise HTTPException(status_code=429, detail="Слишком много сообщений, попробуйте позже")
     logger.info(f"📩 New message from {msg.email}")
     return {"status": "ok", "message": "Сообщение отправлено"}
 
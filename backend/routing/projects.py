@@ -1,40 +1,45 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from core.cache import json_response
 from services.projects import ProjectService
 from schemas.projects import ProjectOut, ProjectCreate, ProjectUpdate
-from depends import get_project_service
+from depends import get_project_read_service, get_project_service
 
 router = APIRouter(prefix="/api/projects", tags=["projects"])
 
 
 @router.get("", response_model=List[ProjectOut])
 async def get_projects(
+    request: Request,
     featured_only: bool = False,
-    service: ProjectService = Depends(get_project_service)
+    service: ProjectService = Depends(get_project_read_service)
 ):
-    return await service.get_projects(featured_only)
+    payload = await service.get_projects_json(featured_only)
+    return json_response(request, payload)
 
 
 @router.get("/{project_id}", response_model=ProjectOut)
 async def get_project(
+    request: Request,
     project_id: int,
-    service: ProjectService = Depends(get_project_service)
+    service: ProjectService = Depends(get_project_read_service)
 ):
-    project = await service.get_project(project_id)
-    if not project:
+    payload = await service.get_project_json(project_id)
+    if payload is None:
         raise HTTPException(status_code=404, detail="Project not found")
-    return project
+    return json_response(request, payload)
 
 
 @router.get("/slug/{slug}", response_model=ProjectOut)
 async def get_project_by_slug(
+    request: Request,
     slug: str,
-    service: ProjectService = Depends(get_project_service)
+    service: ProjectService = Depends(get_project_read_service)
 ):
-    project = await service.get_project_by_slug(slug)
-    if not project:
+    payload = await service.get_project_by_slug_json(slug)
+    if payload is None:
         raise HTTPException(status_code=404, detail="Project not found")
-    return project
+    return json_response(request, payload)
 
 
 @router.post("", response_model=ProjectOut, status_code=201)
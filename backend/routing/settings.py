@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from core.cache import json_response
 from services.settings import SettingsService
 from depends import get_settings_service
 
@@ -6,11 +7,12 @@ router = APIRouter(prefix="/api/settings", tags=["settings"])
 
 @router.get("/{key}")
 async def get_setting(
+    request: Request,
     key: str,
     service: SettingsService = Depends(get_settings_service)
 ):
-    setting = await service.get_setting(key)
-    if not setting:
+    payload = await service.get_setting_json(key)
+    if payload is None:
         raise HTTPException(status_code=404, detail="Setting not found")
-    return {"key": setting.key, "value": setting.value}
+    return json_response(request, payload)
 
@@ -1,5 +1,6 @@
 from typing import List
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
+from core.cache import json_response
 from services.skills import SkillService
 from schemas.skills import SkillOut
 from depends import get_skill_service
@@ -8,8 +9,10 @@ router = APIRouter(prefix="/api/skills", tags=["skills"])
 
 @router.get("", response_model=List[SkillOut])
 async def get_skills(
+    request: Request,
     category: str | None = None,
     service: SkillService = Depends(get_skill_service)
 ):
-    return await service.get_skills(category)
+    payload = await service.get_skills_json(category)
+    return json_response(request, payload)
 
@@ -0,0 +1,71 @@
+"""
+Serving of extracted static projects under /static-projects/{slug}/.
+
+Small text assets (HTML, CSS, JS...) are answered from an in-memory LRU;
+everything else, and any Range request, is streamed from disk in the thread
+pool with HTTP Range support (used by the audio/video players). Strong ETags
+come from inode, mtime and size. Path lookups and stats run in the thread
+pool too.
+
+Text assets are precompressed (.br/.gz) when a project is extracted; those
+variants are picked by Accept-Encoding so nothing is compressed per request.
+"""
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, RedirectResponse, Response
+from starlette.concurrency import run_in_threadpool
+
+from core.cache import etag_matches
+from services.files import StaticProjectFileService
+from services.zip_extract import COMPRESSIBLE_EXTENSIONS
+
+router = APIRouter(prefix="/static-projects", tags=["static-projects"])
+
+static_files = StaticProjectFileService()
+
+
+@router.api_route("/{slug}", methods=["GET", "HEAD"], include_in_schema=False)
+async def redirect_to_project_root(slug: str):
+    # Relative asset URLs in index.html only resolve under the trailing slash
+    return RedirectResponse(url=f"/static-projects/{slug}/", status_code=301)
+
+
+@router.api_route("/{slug}/{file_path:path}", methods=["GET", "HEAD"])
+async def serve_static_project_file(slug: str, file_path: str, request: Request):
+    resolved = await run_in_threadpool(static_files.resolve, slug, file_path)
+    if resolved is None:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    path, stat_result = resolved
+    media_type = static_files.get_mime_type(path.name)
+    headers = {"Cache-Control": "no-cache"}
+
+    encoding = None
+    compressible = path.suffix.lower() in COMPRESSIBLE_EXTENSIONS
+    if compressible:
+        headers["Vary"] = "Accept-Encoding"
+        variant = await run_in_threadpool(
+            static_files.precompressed, path, stat_result, request.headers.get("accept-encoding")
+        )
+        if variant is not None:
+            encoding, path, stat_result = variant
+            headers["Content-Encoding"] = encoding
+
+    etag = static_files.etag(stat_result, encoding)
+    headers["ETag"] = etag
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    # Only text assets are cached; media and Range requests need FileResponse
+    content = None
+    if compressible and "range" not in request.headers:
+        content = await static_files.read_cached(path, stat_result)
+    if content is not None:
+        if request.method == "HEAD":
+            headers["Content-Length"] = str(len(content))
+            return Response(media_type=media_type, headers=headers)
+        return Response(content=content, media_type=media_type, headers=headers)
+
+    # Large files and media: chunked reads off the event loop, Range requests honoured
+    return FileResponse(path, media_type=media_type, headers=headers, stat_result=stat_result)
@@ -1,20 +1,132 @@
+import html
+import logging
 import os
-import uuid
 from pathlib import Path
-from typing import List
+from typing import List, Literal, Optional, Tuple
+from urllib.parse import parse_qs, urlencode
 
-from fastapi import APIRouter, UploadFile, File, HTTPException, Request
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi import APIRouter, BackgroundTasks, Depends, UploadFile, File, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse, HTMLResponse
+from fastapi.staticfiles import StaticFiles
+from sqlalchemy.ext.asyncio import AsyncSession
 
-UPLOAD_DIR = Path("uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
+from core.cache import project_cache
+from core.config import settings
+from db.models import Upload
+from db.session import get_db
+from repositories.uploads import InvalidCursorError, UploadPage, UploadRepository
+from routing.admin_api import require_admin
+from services.images import (
+    build_srcset, generate_derivatives, is_derivable, load_manifest, load_manifests,
+    resize_cache, resize_formats, thumbnail_url,
+)
+from services.uploads import (
+    UPLOAD_DIR, ALLOWED_EXTENSIONS, FileTooLargeError,
+    delete_uploads, is_fingerprinted, referenced_uploads, register_uploads, replace_upload, save_upload,
+)
 
-ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg"}
-MAX_FILE_SIZE = 5 * 1024 * 1024
+# Fingerprinted names never change content, so browsers may keep them forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Files uploaded before fingerprinting keep the previous 30 day policy
+LEGACY_CACHE_CONTROL = "public, max-age=2592000"
+
+RESIZE_PARAMS = ("w", "h", "fmt")
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/uploads", tags=["uploads"])
 
 
+def cache_control_for(filename: str) -> str:
+    return IMMUTABLE_CACHE_CONTROL if is_fingerprinted(filename) else LEGACY_CACHE_CONTROL
+
+
+class UploadStaticFiles(StaticFiles):
+    """
+    /uploads mount that hides dot-files (the blob store, resize cache and
+    in-flight temp files) and marks fingerprinted files as immutable.
+
+    ``?w=``, ``?h=`` and ``?fmt=`` on an image return a resized copy from
+    the on-demand resize cache instead of the original.
+    """
+
+    async def get_response(self, path: str, scope):
+        if any(part.startswith(".") for part in Path(path).parts):
+            raise HTTPException(status_code=404)
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        if any(param in query for param in RESIZE_PARAMS):
+            return await self.resized_response(path, query, scope)
+        return await super().get_response(path, scope)
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        response.headers["Cache-Control"] = cache_control_for(Path(full_path).name)
+        return response
+
+    async def resized_response(self, path: str, query: dict, scope):
+        if scope["method"] not in ("GET", "HEAD"):
+            raise HTTPException(status_code=405)
+
+        filename = Path(path).name
+        # Only top-level uploads; variants/ are already sized
+        if path != filename or not is_derivable(filename) or not (UPLOAD_DIR / filename).is_file():
+            raise HTTPException(status_code=404)
+
+        size, fmt = parse_resize_params(query, filename)
+        try:
+            cached = await resize_cache.get(filename, size, fmt)
+        except Exception:
+            logger.exception(f"Failed to resize {filename}")
+            raise HTTPException(status_code=422, detail="Не удалось обработать изображение")
+
+        try:
+            stat_result = os.stat(cached)
+        except FileNotFoundError:
+            # Evicted between render and response by another worker's render
+            cached = await resize_cache.get(filename, size, fmt)
+            stat_result = os.stat(cached)
+        response = super().file_response(cached, stat_result, scope)
+        # The rendering is as stable as its source name
+        response.headers["Cache-Control"] = cache_control_for(filename)
+        return response
+
+
+def parse_resize_params(query: dict, filename: str) -> Tuple[Tuple[int, int], str]:
+    """
+    Validate ``w``, ``h`` and ``fmt`` of an on-demand resize.
+
+    At least one of ``w``/``h`` is required; a side that is left out is
+    unconstrained.
+
+    Returns:
+        Bounding box (width, height; 0 = unconstrained) and output format
+    """
+    if "w" not in query and "h" not in query:
+        raise HTTPException(status_code=400, detail="Укажите ширину (w) или высоту (h)")
+
+    size = []
+    for param in ("w", "h"):
+        if param not in query:
+            size.append(0)
+            continue
+        value = query[param][0]
+        if not value.isdigit() or not 1 <= int(value) <= settings.IMAGE_RESIZE_MAX_DIMENSION:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Параметр {param} должен быть от 1 до {settings.IMAGE_RESIZE_MAX_DIMENSION}"
+            )
+        size.append(int(value))
+
+    source_format = Path(filename).suffix.lower().lstrip(".").replace("jpg", "jpeg")
+    fmt = query.get("fmt", [source_format])[0].lower().replace("jpg", "jpeg")
+    if fmt not in resize_formats():
+        raise HTTPException(
+            status_code=400,
+            detail=f"Недопустимый формат. Разрешены: {', '.join(resize_formats())}"
+        )
+    return (size[0], size[1]), fmt
+
+
 def validate_file(file: UploadFile) -> None:
     ext = Path(file.filename).suffix.lower()
     if ext not in ALLOWED_EXTENSIONS:
@@ -25,93 +137,225 @@ def validate_file(file: UploadFile) -> None:
 
 
 @router.post("")
-async def upload_file(file: UploadFile = File(...)):
+async def upload_file(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    db: AsyncSession = Depends(get_db)
+):
     validate_file(file)
     
-    content = await file.read()
-    if len(content) > MAX_FILE_SIZE:
+    try:
+        stored = await save_upload(file)
+    except FileTooLargeError:
         raise HTTPException(status_code=400, detail="Файл слишком большой (макс. 5MB)")
     
-    ext = Path(file.filename).suffix.lower()
-    filename = f"{uuid.uuid4().hex}{ext}"
-    file_path = UPLOAD_DIR / filename
-    
-    with open(file_path, "wb") as f:
-        f.write(content)
+    await register_uploads(db, [stored])
+    await db.commit()
+    # Thumbnails and WebP/AVIF variants are rendered after the response, in the process pool
+    background_tasks.add_task(generate_derivatives, [stored.filename])
     
-    return JSONResponse({
-        "filename": filename,
-        "url": f"/uploads/{filename}",
-        "size": len(content)
+    return ORJSONResponse({
+        "filename": stored.filename,
+        "url": f"/uploads/{stored.filename}",
+        "size": stored.size
     })
 
 
 @router.post("/multiple")
-async def upload_multiple_files(files: List[UploadFile] = File(...)):
+async def upload_multiple_files(
+    background_tasks: BackgroundTasks,
+    files: List[UploadFile] = File(...),
+    db: AsyncSession = Depends(get_db)
+):
     results = []
+    stored_files = []
     for file in files:
         validate_file(file)
-        content = await file.read()
-        if len(content) > MAX_FILE_SIZE:
+        try:
+            stored = await save_upload(file)
+        except FileTooLargeError:
             continue
         
-        ext = Path(file.filename).suffix.lower()
-        filename = f"{uuid.uuid4().hex}{ext}"
-        file_path = UPLOAD_DIR / filename
-        
-        with open(file_path, "wb") as f:
-            f.write(content)
-        
+        stored_files.append(stored)
         results.append({
             "original_name": file.filename,
-            "filename": filename,
-            "url": f"/uploads/{filename}",
-            "size": len(content)
+            "filename": stored.filename,
+            "url": f"/uploads/{stored.filename}",
+            "size": stored.size
         })
     
-    return JSONResponse({"files": results})
+    await register_uploads(db, stored_files)
+    await db.commit()
+    background_tasks.add_task(generate_derivatives, [stored.filename for stored in stored_files])
+    
+    return ORJSONResponse({"files": results})
+
+
+async def get_upload_page(
+    sort: Literal["created_at", "size", "filename"] = "created_at",
+    order: Literal["asc", "desc"] = "desc",
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    q: Optional[str] = Query(None, max_length=100),
+    type: Optional[str] = Query(None, max_length=100),
+    db: AsyncSession = Depends(get_db)
+) -> UploadPage:
+    try:
+        return await UploadRepository(db).get_page(
+            sort=sort,
+            descending=order == "desc",
+            cursor=cursor,
+            limit=limit,
+            search=q,
+            mime_type=type,
+        )
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Недопустимый курсор")
+
+
+def manager_thumbnail(url: str) -> str:
+    # Uses the manifests the endpoint loaded with load_manifests()
+    thumb = thumbnail_url(url, 120)
+    if thumb == url and is_derivable(url):
+        # Files without eager variants (older uploads) get an on-demand size
+        thumb = f"{url}?w=120&h=120&fmt=webp"
+    return thumb
+
+
+def upload_item(upload: Upload) -> dict:
+    url = f"/uploads/{upload.filename}"
+    return {
+        "filename": upload.filename,
+        "url": url,
+        "thumbnail_url": manager_thumbnail(url),
+        "size": upload.size,
+        "mime_type": upload.mime_type,
+        "width": upload.width,
+        "height": upload.height,
+        "sha256": upload.sha256,
+        "created_at": upload.created_at.isoformat() if upload.created_at else None,
+    }
+
+
+@router.get("")
+async def list_files(page: UploadPage = Depends(get_upload_page)):
+    await load_manifests(f"/uploads/{upload.filename}" for upload in page.items)
+    return ORJSONResponse({
+        "items": [upload_item(upload) for upload in page.items],
+        "next_cursor": page.next_cursor,
+        "total": page.total
+    })
+
+
+@router.get("/{filename}/variants")
+async def get_variants(filename: str):
+    manifest = await load_manifest(f"/uploads/{filename}")
+    if manifest is None:
+        if not (UPLOAD_DIR / filename).is_file():
+            raise HTTPException(status_code=404, detail="Файл не найден")
+        # Variants not rendered yet, or a format without variants (SVG, GIF)
+        return ORJSONResponse({"url": f"/uploads/{filename}", "variants": [], "srcset": {}})
+    
+    formats = sorted({v["format"] for v in manifest["variants"]})
+    return ORJSONResponse({
+        "url": f"/uploads/{filename}",
+        "width": manifest["width"],
+        "height": manifest["height"],
+        "variants": manifest["variants"],
+        "srcset": {fmt: build_srcset(manifest, fmt) for fmt in formats}
+    })
+
+
+@router.put("/{filename}", dependencies=[Depends(require_admin)])
+async def replace_file(
+    filename: str,
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    db: AsyncSession = Depends(get_db)
+):
+    if ".." in filename or "/" in filename or filename.startswith("."):
+        raise HTTPException(status_code=400, detail="Недопустимое имя файла")
+    
+    if not (UPLOAD_DIR / filename).exists():
+        raise HTTPException(status_code=404, detail="Файл не найден")
+    
+    validate_file(file)
+    try:
+        stored = await save_upload(file)
+    except FileTooLargeError:
+        raise HTTPException(status_code=400, detail="Файл слишком большой (макс. 5MB)")
+    
+    # The new file gets a new URL; project and gallery rows are rewritten to it
+    rewritten = await replace_upload(db, filename, stored)
+    project_cache.invalidate()
+    background_tasks.add_task(generate_derivatives, [stored.filename])
+    
+    return ORJSONResponse({
+        "filename": stored.filename,
+        "url": f"/uploads/{stored.filename}",
+        "size": stored.size,
+        "replaced": filename,
+        "updated_records": rewritten
+    })
 
 
 @router.delete("/{filename}")
-async def delete_file(filename: str):
+async def delete_file(filename: str, db: AsyncSession = Depends(get_db)):
     file_path = UPLOAD_DIR / filename
     if not file_path.exists():
         raise HTTPException(status_code=404, detail="Файл не найден")
     
-    if ".." in filename or "/" in filename:
+    if ".." in filename or "/" in filename or filename.startswith("."):
         raise HTTPException(status_code=400, detail="Недопустимое имя файла")
     
-    os.remove(file_path)
-    return JSONResponse({"message": "Файл удалён"})
+    # Fingerprinted names are shared by every record that uploaded the same content
+    if await referenced_uploads(db, [filename]):
+        raise HTTPException(status_code=409, detail="Файл используется в проектах или галерее")
+    
+    # The blob behind the file is removed only when nothing else references it
+    await delete_uploads(db, [filename])
+    return ORJSONResponse({"message": "Файл удалён"})
 
 
 @router.get("/manager", response_class=HTMLResponse)
-async def upload_manager(request: Request):
-    files = []
-    for f in UPLOAD_DIR.iterdir():
-        if f.is_file():
-            files.append({
-                "name": f.name,
-                "url": f"/uploads/{f.name}",
-                "size": f.stat().st_size
-            })
-    files.sort(key=lambda x: x["name"])
-    
+async def upload_manager(request: Request, page: UploadPage = Depends(get_upload_page)):
+    await load_manifests(f"/uploads/{upload.filename}" for upload in page.items)
     files_html = ""
-    for f in files:
+    for upload in page.items:
+        f = upload_item(upload)
         size_kb = f["size"] / 1024
+        dimensions = f" · {f['width']}×{f['height']}" if f["width"] else ""
         files_html += f'''
         <div class="file-item">
-            <img src="{f['url']}" alt="{f['name']}" onerror="this.style.display='none'">
+            <img src="{f['thumbnail_url']}" alt="{f['filename']}" loading="lazy" onerror="this.style.display='none'">
             <div class="file-info">
                 <code>{f['url']}</code>
-                <span class="file-size">{size_kb:.1f} KB</span>
+                <span class="file-size">{size_kb:.1f} KB{dimensions}</span>
             </div>
             <button onclick="copyUrl('{f['url']}')" class="btn-copy">📋 Копировать</button>
-            <button onclick="deleteFile('{f['name']}')" class="btn-delete">🗑️</button>
+            <button onclick="deleteFile('{f['filename']}')" class="btn-delete">🗑️</button>
         </div>
         '''
     
+    params = request.query_params
+    sort, order = params.get("sort", "created_at"), params.get("order", "desc")
+    search = html.escape(params.get("q", ""))
+    pagination = ""
+    if "cursor" in params:
+        first_page = urlencode({k: v for k, v in params.items() if k != "cursor"})
+        pagination += f'<a href="?{first_page}" class="page-link">⏮ В начало</a>'
+    if page.next_cursor:
+        next_page = urlencode({**params, "cursor": page.next_cursor})
+        pagination += f'<a href="?{next_page}" class="page-link">Далее →</a>'
+    sort_options = "".join(
+        f'<option value="{value}"{" selected" if value == sort else ""}>{label}</option>'
+        for value, label in (("created_at", "По дате"), ("size", "По размеру"), ("filename", "По имени"))
+    )
+    order_options = "".join(
+        f'<option value="{value}"{" selected" if value == order else ""}>{label}</option>'
+        for value, label in (("desc", "↓"), ("asc", "↑"))
+    )
+    
     return f'''
     <!DOCTYPE html>
     <html>
@@ -219,6 +463,18 @@ async def upload_manager(request: Request):
                 display: none;
             }}
             .toast.show {{ display: block; }}
+            .filters {{ display: flex; gap: 0.5rem; margin-bottom: 1rem; }}
+            .filters input, .filters select {{
+                background: #1a1a2e;
+                color: #e5e5e5;
+                border: 1px solid #374151;
+                border-radius: 6px;
+                padding: 0.5rem;
+            }}
+            .filters input {{ flex: 1; }}
+            .pagination {{ display: flex; gap: 1rem; justify-content: center; margin-top: 1rem; }}
+            .page-link {{ color: #6366f1; text-decoration: none; }}
+            .page-link:hover {{ text-decoration: underline; }}
         </style>
     </head>
     <body>
@@ -235,10 +491,17 @@ async def upload_manager(request: Request):
                 </label>
             </div>
             
-            <h3>Загруженные файлы ({len(files)})</h3>
+            <h3>Загруженные файлы ({page.total})</h3>
+            <form class="filters" method="get">
+                <input type="search" name="q" value="{search}" placeholder="Поиск по имени">
+                <select name="sort">{sort_options}</select>
+                <select name="order">{order_options}</select>
+                <button type="submit" class="btn-copy">Применить</button>
+            </form>
             <div class="files-list">
                 {files_html if files_html else '<p style="color:#6b7280;">Нет загруженных файлов</p>'}
             </div>
+            <div class="pagination">{pagination}</div>
         </div>
         
         <div class="toast" id="toast">Скопировано!</div>
@@ -284,7 +547,11 @@ async def upload_manager(request: Request):
             
             async function deleteFile(filename) {{
                 if (!confirm('Удалить ' + filename + '?')) return;
-                await fetch('/api/uploads/' + filename, {{ method: 'DELETE' }});
+                const response = await fetch('/api/uploads/' + filename, {{ method: 'DELETE' }});
+                if (!response.ok) {{
+                    alert('Ошибка: ' + (await response.json()).detail);
+                    return;
+                }}
                 location.reload();
             }}
         </script>
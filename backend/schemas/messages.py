@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from typing import Optional
 
 class MessageBase(BaseModel):
@@ -8,7 +8,11 @@ class MessageBase(BaseModel):
     message: str
 
 class MessageCreate(MessageBase):
-    pass
+    # Column limits of db.models.Message: messages are stored in batches after
+    # the response, so anything the database would reject is refused up front
+    name: str = Field(..., max_length=100)
+    email: EmailStr = Field(..., max_length=200)
+    subject: Optional[str] = Field(None, max_length=300)
 
 class MessageOut(MessageBase):
     id: int
@@ -54,6 +54,8 @@ class ProjectOut(ProjectBase):
     id: int
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
+    # WebP variants of the cover, once they have been rendered (filled in by the service)
+    image_srcset: Optional[str] = None
 
     class Config:
         from_attributes = True
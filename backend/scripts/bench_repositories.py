@@ -0,0 +1,147 @@
+"""
+Per-call overhead of the hot repository queries.
+
+Compares the prebuilt statements in repositories/ with building the same
+select() on every call (how the repositories used to work), against a
+throwaway SQLite database:
+
+    cd backend && python scripts/bench_repositories.py [--calls 5000]
+
+"construct" times only building the statement and its cache key; "call"
+times the full repository method, including the query.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from db.models import Base, Project, Settings as SettingsModel, Skill
+from repositories import projects as project_repo, settings as settings_repo, skills as skill_repo
+from repositories.projects import ProjectRepository
+from repositories.settings import SettingsRepository
+from repositories.skills import SkillRepository
+
+
+# Statements as they were built per call before
+def legacy_statements():
+    return {
+        "projects.get_all": lambda: select(Project).order_by(Project.order),
+        "projects.get_by_id": lambda: select(Project).where(Project.id == 1),
+        "projects.get_by_slug": lambda: select(Project).where(Project.slug == "project-1"),
+        "projects.slug_exists": lambda: select(Project.id).where(Project.slug == "project-1"),
+        "skills.get_all": lambda: select(Skill).order_by(Skill.order),
+        "settings.get_by_key": lambda: select(SettingsModel).where(SettingsModel.key == "key-1"),
+    }
+
+
+def prebuilt_statements():
+    return {
+        "projects.get_all": project_repo._ALL_PROJECTS,
+        "projects.get_by_id": project_repo._PROJECT_BY_ID,
+        "projects.get_by_slug": project_repo._PROJECT_BY_SLUG,
+        "projects.slug_exists": project_repo._SLUG_TAKEN,
+        "skills.get_all": skill_repo._ALL_SKILLS,
+        "settings.get_by_key": settings_repo._SETTING_BY_KEY,
+    }
+
+
+def repository_calls(session: AsyncSession):
+    projects, skills, settings = ProjectRepository(session), SkillRepository(session), SettingsRepository(session)
+    return {
+        "projects.get_all": lambda: projects.get_all(),
+        "projects.get_by_id": lambda: projects.get_by_id(1),
+        "projects.get_by_slug": lambda: projects.get_by_slug("project-1"),
+        "projects.slug_exists": lambda: projects.slug_exists("project-1"),
+        "skills.get_all": lambda: skills.get_all(),
+        "settings.get_by_key": lambda: settings.get_by_key("key-1"),
+    }
+
+
+def legacy_calls(session: AsyncSession):
+    async def run(build, scalar: bool):
+        result = await session.execute(build())
+        return result.scalar_one_or_none() if scalar else result.scalars().all()
+
+    built = legacy_statements()
+    return {
+        name: (lambda build=build, scalar=not name.endswith("get_all"): run(build, scalar))
+        for name, build in built.items()
+    }
+
+
+def time_construct(calls: int) -> dict:
+    timings = {}
+    prebuilt = prebuilt_statements()
+    for name, build in legacy_statements().items():
+        started = time.perf_counter()
+        for _ in range(calls):
+            build()._generate_cache_key()
+        legacy = time.perf_counter() - started
+
+        stmt = prebuilt[name]
+        started = time.perf_counter()
+        for _ in range(calls):
+            stmt._generate_cache_key()
+        timings[name] = (legacy, time.perf_counter() - started)
+    return timings
+
+
+async def time_calls(session: AsyncSession, calls: int) -> dict:
+    timings = {}
+    legacy, current = legacy_calls(session), repository_calls(session)
+    for name in legacy:
+        results = []
+        for variant in (legacy[name], current[name]):
+            for _ in range(100):  # warm the compiled cache and the page cache
+                await variant()
+            started = time.perf_counter()
+            for _ in range(calls):
+                await variant()
+            results.append(time.perf_counter() - started)
+        timings[name] = tuple(results)
+    return timings
+
+
+async def seed(session: AsyncSession) -> None:
+    session.add_all(
+        Project(title=f"Project {i}", slug=f"project-{i}", order=i, is_featured=i % 3 == 0)
+        for i in range(1, 21)
+    )
+    session.add_all(Skill(name=f"Skill {i}", category=f"cat-{i % 4}", order=i) for i in range(40))
+    session.add_all(SettingsModel(key=f"key-{i}", value=str(i)) for i in range(20))
+    await session.commit()
+
+
+def report(title: str, timings: dict, calls: int) -> None:
+    print(f"\n{title} (µs per call, {calls} calls)")
+    print(f"{'query':<24}{'per-call select()':>20}{'prebuilt':>12}{'saved':>10}")
+    for name, (legacy, current) in timings.items():
+        before, after = legacy / calls * 1e6, current / calls * 1e6
+        print(f"{name:<24}{before:>20.1f}{after:>12.1f}{before - after:>10.1f}")
+
+
+async def main(calls: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        async with session_factory() as session:
+            await seed(session)
+            report("Statement construction + cache key", time_construct(calls), calls)
+            report("Repository call on SQLite", await time_calls(session, calls), calls)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=5000)
+    asyncio.run(main(parser.parse_args().calls))
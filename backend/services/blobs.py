@@ -0,0 +1,126 @@
+"""
+Content-addressed blob store for uploaded files and static project assets.
+
+Every stored file is kept once under ``BLOB_STORE_DIR/{sha[:2]}/{sha}``,
+keyed by the SHA-256 of its content (computed while the data streams in).
+The public names in uploads/ and static-projects/ are hard links to the
+blob, so an identical upload only adds a directory entry; when the
+destination is on another filesystem the blob is copied instead.
+
+Which public paths reference which blob is recorded in the database
+(``repositories/blobs.py``). A blob file is removed once its last reference
+is released. Because public names are hard links, removing a blob never
+affects files that were already materialized from it.
+"""
+import errno
+import hashlib
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Iterable, Tuple
+
+from core.config import settings
+
+CHUNK_SIZE = 64 * 1024
+
+# Blobs being written; never visible under their final name until complete
+TEMP_PREFIX = ".blob-"
+
+# Errors after which a hard link is replaced by a copy
+_LINK_FALLBACK_ERRNOS = {errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP}
+
+
+class BlobStore:
+    """Filesystem side of the blob store. All methods are blocking."""
+
+    def __init__(self, root: Path = Path(settings.BLOB_STORE_DIR)):
+        self.root = root
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path_for(self, sha256: str) -> Path:
+        return self.root / sha256[:2] / sha256
+
+    def exists(self, sha256: str) -> bool:
+        return self.path_for(sha256).is_file()
+
+    def shares_device(self, directory: Path) -> bool:
+        """True if files in ``directory`` can be hard links to blobs."""
+        try:
+            return os.stat(directory).st_dev == os.stat(self.root).st_dev
+        except OSError:
+            return False
+
+    def ingest(self, tmp_path: Path, sha256: str) -> Path:
+        """
+        Move a fully written temporary file into the store.
+
+        If a blob with the same content already exists the temporary file is
+        discarded, which makes a duplicate upload metadata-only.
+
+        Args:
+            tmp_path: Completed temporary file (on the store's filesystem)
+            sha256: Hex digest of its content
+
+        Returns:
+            Path of the blob
+        """
+        blob_path = self.path_for(sha256)
+        if blob_path.is_file():
+            tmp_path.unlink(missing_ok=True)
+            return blob_path
+
+        blob_path.parent.mkdir(exist_ok=True)
+        # mkstemp creates owner-only files; blobs back public files
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, blob_path)
+        return blob_path
+
+    def ingest_stream(self, source: BinaryIO) -> Tuple[str, int]:
+        """
+        Copy a readable stream into the store, hashing it on the way.
+
+        Returns:
+            SHA-256 hex digest and size in bytes
+        """
+        fd, tmp_name = tempfile.mkstemp(dir=self.root, prefix=TEMP_PREFIX)
+        tmp_path = Path(tmp_name)
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while chunk := source.read(CHUNK_SIZE):
+                    digest.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        sha256 = digest.hexdigest()
+        self.ingest(tmp_path, sha256)
+        return sha256, size
+
+    def materialize(self, sha256: str, dest: Path) -> None:
+        """
+        Make ``dest`` a file with the blob's content: a hard link where the
+        filesystem allows it, a copy otherwise. An existing ``dest`` is replaced.
+        """
+        blob_path = self.path_for(sha256)
+        tmp_dest = dest.with_name(f"{TEMP_PREFIX}{dest.name}")
+        tmp_dest.unlink(missing_ok=True)
+        try:
+            os.link(blob_path, tmp_dest)
+        except OSError as e:
+            if e.errno not in _LINK_FALLBACK_ERRNOS:
+                raise
+            shutil.copyfile(blob_path, tmp_dest)
+            os.chmod(tmp_dest, 0o644)
+        os.replace(tmp_dest, dest)
+
+    def remove(self, digests: Iterable[str]) -> None:
+        """Delete blobs that are no longer referenced."""
+        for sha256 in digests:
+            self.path_for(sha256).unlink(missing_ok=True)
+
+
+blob_store = BlobStore()
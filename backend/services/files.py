@@ -4,8 +4,13 @@ File services for handling ZIP extraction and static project files.
 import os
 import shutil
 import zipfile
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from core.config import settings
 
 # Directory for extracted static projects
 STATIC_PROJECTS_DIR = Path("static-projects")
@@ -195,11 +200,98 @@ class ZipExtractService:
         return False
 
 
+class HotFileCache:
+    """
+    LRU cache of small static project text files (index.html, CSS, JS...),
+    bounded by the total number of cached bytes. The caller only offers text
+    assets: the cached bytes are served without Range support. Entries are keyed by path
+    and validated by ETag, so a re-published file is never served stale.
+    """
+    
+    def __init__(self, max_bytes: int, max_file_size: int):
+        self.max_bytes = max_bytes
+        self.max_file_size = max_file_size
+        self._entries: "OrderedDict[str, Tuple[str, bytes]]" = OrderedDict()
+        self._size = 0
+    
+    def accepts(self, size: int) -> bool:
+        return size <= self.max_file_size and size <= self.max_bytes
+    
+    def get(self, key: str, etag: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] != etag:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+    
+    def put(self, key: str, etag: str, data: bytes) -> None:
+        if not self.accepts(len(data)):
+            return
+        self._remove(key)
+        self._entries[key] = (etag, data)
+        self._size += len(data)
+        while self._size > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+    
+    def clear(self) -> None:
+        self._entries.clear()
+        self._size = 0
+    
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[1])
+
+
+hot_file_cache = HotFileCache(
+    max_bytes=settings.STATIC_PROJECT_CACHE_BYTES,
+    max_file_size=settings.STATIC_PROJECT_CACHE_MAX_FILE_SIZE,
+)
+
+
+# Precompressed siblings written at extraction time, in order of preference
+PRECOMPRESSED_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    """
+    Parse an Accept-Encoding header into a mapping of coding -> q-value.
+    
+    Args:
+        header: Raw header value (may be None)
+        
+    Returns:
+        Mapping of lower-cased content codings to their quality
+    """
+    accepted: Dict[str, float] = {}
+    if not header:
+        return accepted
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
 class StaticProjectFileService:
     """Service for serving and managing static project files."""
     
-    def __init__(self, base_dir: Path = STATIC_PROJECTS_DIR):
+    def __init__(self, base_dir: Path = STATIC_PROJECTS_DIR, cache: HotFileCache = hot_file_cache):
         self.base_dir = base_dir
+        self.cache = cache
     
     def get_file_path(self, slug: str, file_path: str) -> Optional[Path]:
         """
@@ -223,7 +315,7 @@ class StaticProjectFileService:
             full_path = full_path.resolve()
             project_dir = (self.base_dir / slug).resolve()
             
-            if not str(full_path).startswith(str(project_dir)):
+            if not full_path.is_relative_to(project_dir):
                 return None
         except (OSError, ValueError):
             return None
@@ -245,6 +337,93 @@ class StaticProjectFileService:
         """
         return self.get_file_path(slug, 'index.html')
     
+    def resolve(self, slug: str, file_path: str) -> Optional[Tuple[Path, os.stat_result]]:
+        """
+        Resolve a request path to a file and its stat result.
+        Directory paths (including the project root) map to their index.html.
+        
+        Args:
+            slug: Project slug
+            file_path: Relative path within the project
+            
+        Returns:
+            File path and stat result, or None if not found/invalid
+        """
+        if slug.startswith('.'):
+            return None
+        
+        file_path = file_path.strip('/')
+        path = self.get_file_path(slug, file_path) if file_path else None
+        if path is None:
+            path = self.get_file_path(slug, f"{file_path}/index.html" if file_path else 'index.html')
+        if path is None:
+            return None
+        
+        try:
+            return path, path.stat()
+        except OSError:
+            return None
+    
+    def precompressed(
+        self, path: Path, stat_result: os.stat_result, accept_encoding: Optional[str]
+    ) -> Optional[Tuple[str, Path, os.stat_result]]:
+        """
+        Pick a precompressed sibling of ``path`` the client accepts.
+        
+        Args:
+            path: Resolved original file
+            stat_result: Stat result of the original file
+            accept_encoding: Request Accept-Encoding header
+            
+        Returns:
+            Content coding, compressed file path and its stat result,
+            or None to serve the original
+        """
+        accepted = parse_accept_encoding(accept_encoding)
+        if not accepted:
+            return None
+        
+        for coding, suffix in PRECOMPRESSED_ENCODINGS:
+            if accepted.get(coding, accepted.get('*', 0.0)) <= 0:
+                continue
+            candidate = path.with_name(path.name + suffix)
+            try:
+                candidate_stat = candidate.stat()
+            except OSError:
+                continue
+            # A variant older than its source is stale (file replaced after extraction)
+            if candidate_stat.st_mtime_ns < stat_result.st_mtime_ns:
+                continue
+            return coding, candidate, candidate_stat
+        return None
+    
+    @staticmethod
+    def etag(stat_result: os.stat_result, encoding: Optional[str] = None) -> str:
+        """Strong ETag derived from inode, modification time, size and content coding."""
+        tag = f"{stat_result.st_ino:x}-{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"
+        if encoding:
+            tag = f"{tag}-{encoding}"
+        return f'"{tag}"'
+    
+    async def read_cached(self, path: Path, stat_result: os.stat_result) -> Optional[bytes]:
+        """
+        Return the contents of a small file from the hot-file cache, reading it
+        in the thread pool on a miss. Returns None for files too large to cache,
+        which should be streamed instead.
+        """
+        if not self.cache.accepts(stat_result.st_size):
+            return None
+        
+        key = str(path)
+        # Compressed variants are cached under their own path, so the
+        # inode/mtime/size tag is enough to validate the entry
+        etag = self.etag(stat_result)
+        data = self.cache.get(key, etag)
+        if data is None:
+            data = await run_in_threadpool(path.read_bytes)
+            self.cache.put(key, etag, data)
+        return data
+    
     def list_files(self, slug: str) -> list[str]:
         """
         List all files in a static project directory.
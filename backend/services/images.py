@@ -0,0 +1,450 @@
+"""
+Responsive derivatives of uploaded images.
+
+When an upload lands, a background task renders fixed-width variants
+(``IMAGE_DERIVATIVE_WIDTHS``, never wider than the original) in WebP, and in
+AVIF when the installed Pillow can encode it. Rendering runs in a process
+pool so resizing large photos never competes with the event loop.
+
+Variants are written to ``uploads/variants/{filename}.w{width}.{format}``
+next to a ``{filename}.json`` manifest. Upload names are content
+fingerprints, so a variant name identifies its content too and is cached as
+immutable. Manifests are read in a worker thread and kept in memory
+(``load_manifests``); the synchronous helpers only use what is loaded.
+
+Other sizes are rendered on demand (``/uploads/{file}?w=&h=&fmt=``) into a
+disk cache bounded by ``IMAGE_RESIZE_CACHE_BYTES``; see ``ResizeCache``.
+"""
+import asyncio
+import fcntl
+import glob
+import json
+import logging
+import multiprocessing
+import os
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from core.cache import project_cache
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_DIR = Path("uploads")
+VARIANTS_DIR = UPLOAD_DIR / "variants"
+VARIANTS_DIR.mkdir(parents=True, exist_ok=True)
+
+# Raster formats Pillow can resize; SVG and (possibly animated) GIF are served as is
+DERIVABLE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+
+# Preferred first: srcset/thumbnail helpers fall back along this order
+VARIANT_FORMATS = ("webp", "avif")
+
+# Formats accepted by ?fmt= (AVIF only where Pillow can encode it)
+RESIZE_FORMATS = {"webp": "WEBP", "avif": "AVIF", "jpeg": "JPEG", "png": "PNG"}
+
+# Renders of the same variant in different app workers serialize on one of
+# these lock files; striping keeps their number bounded
+RESIZE_LOCK_STRIPES = 64
+
+# Manifests kept in memory, oldest dropped first
+MANIFEST_CACHE_SIZE = 1024
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn: forking a process that runs an event loop and DB threads is unsafe
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.IMAGE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def shutdown() -> None:
+    """Stop the worker processes (called on application shutdown)."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+# ============== Rendering (runs in worker processes) ==============
+
+def render_derivatives(source: str, variants_dir: str, widths: List[int], quality: int) -> Dict:
+    """
+    Render every variant of one image and write its manifest.
+
+    Args:
+        source: Path of the original upload
+        variants_dir: Output directory
+        widths: Target widths in pixels
+        quality: Encoder quality (0-100)
+
+    Returns:
+        The manifest that was written
+    """
+    from PIL import Image, ImageOps
+
+    src = Path(source)
+    out_dir = Path(variants_dir)
+    # AVIF is only registered by Pillow builds that can encode it
+    Image.init()
+    formats = [fmt for fmt in VARIANT_FORMATS if fmt.upper() in Image.SAVE]
+
+    with Image.open(src) as opened:
+        if getattr(opened, "is_animated", False):
+            return {}
+        image = ImageOps.exif_transpose(opened)
+        has_alpha = image.mode in ("RGBA", "LA") or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+
+    width, height = image.size
+    targets = sorted({w for w in widths if w < width} | {width})
+
+    variants = []
+    for target in targets:
+        resized = image if target == width else image.resize(
+            (target, max(1, round(height * target / width))),
+            Image.LANCZOS,
+            reducing_gap=3.0,
+        )
+        for fmt in formats:
+            name = f"{src.name}.w{target}.{fmt}"
+            tmp = out_dir / f".{name}.part"
+            resized.save(tmp, format=fmt.upper(), quality=quality)
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, out_dir / name)
+            variants.append({
+                "width": target,
+                "height": resized.height,
+                "format": fmt,
+                "url": f"/uploads/{VARIANTS_DIR.name}/{name}",
+            })
+
+    manifest = {"width": width, "height": height, "variants": variants}
+    tmp = out_dir / f".{src.name}.json.part"
+    tmp.write_text(json.dumps(manifest))
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, out_dir / f"{src.name}.json")
+    return manifest
+
+
+def render_resized(source: str, dest: str, lock_path: str, size: Tuple[int, int], fmt: str, quality: int) -> int:
+    """
+    Render one on-demand size of an image into the resize cache.
+
+    The render holds an exclusive lock on ``lock_path`` so another process
+    asked for the same variant waits and then finds the finished file.
+
+    Args:
+        source: Path of the original upload
+        dest: Cache file to create
+        lock_path: Lock file shared by every process rendering ``dest``
+        size: Bounding box (width, height); 0 leaves that side unconstrained
+        fmt: Key of ``RESIZE_FORMATS``
+        quality: Encoder quality (0-100)
+
+    Returns:
+        Size of the cache file in bytes
+    """
+    from PIL import Image, ImageOps
+
+    dest_path = Path(dest)
+    with open(lock_path, "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if dest_path.is_file():
+            return dest_path.stat().st_size
+
+        with Image.open(source) as opened:
+            image = ImageOps.exif_transpose(opened)
+            has_alpha = image.mode in ("RGBA", "LA") or "transparency" in image.info
+            image = image.convert("RGBA" if has_alpha and fmt != "jpeg" else "RGB")
+
+        width, height = image.size
+        box = (size[0] or width, size[1] or height)
+        # Fit inside the box, never upscale
+        scale = min(box[0] / width, box[1] / height, 1.0)
+        if scale < 1.0:
+            image = image.resize(
+                (max(1, round(width * scale)), max(1, round(height * scale))),
+                Image.LANCZOS,
+                reducing_gap=3.0,
+            )
+
+        tmp = dest_path.with_name(f".{dest_path.name}.part")
+        image.save(tmp, format=RESIZE_FORMATS[fmt], quality=quality)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, dest_path)
+        return dest_path.stat().st_size
+
+
+# ============== Scheduling ==============
+
+def is_derivable(filename: str) -> bool:
+    return Path(filename).suffix.lower() in DERIVABLE_EXTENSIONS
+
+
+def image_dimensions(path: Path) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Width and height from the image header (the pixel data is not decoded).
+    (None, None) for SVG and files Pillow cannot read.
+    """
+    from PIL import Image, UnidentifiedImageError
+
+    if path.suffix.lower() == ".svg":
+        return None, None
+    try:
+        with Image.open(path) as image:
+            return image.size
+    except (OSError, UnidentifiedImageError):
+        return None, None
+
+
+async def generate_derivatives(filenames: Iterable[str]) -> None:
+    """
+    Render variants for freshly stored uploads in the process pool.
+    Meant to run as a background task after the upload response.
+    """
+    loop = asyncio.get_running_loop()
+    generated = False
+    for filename in filenames:
+        if not is_derivable(filename) or await asyncio.to_thread(manifest_path(filename).exists):
+            continue
+        try:
+            manifest = await loop.run_in_executor(
+                _get_pool(),
+                render_derivatives,
+                str(UPLOAD_DIR / filename),
+                str(VARIANTS_DIR),
+                list(settings.IMAGE_DERIVATIVE_WIDTHS),
+                settings.IMAGE_DERIVATIVE_QUALITY,
+            )
+            if manifest:
+                _remember_manifest(filename, manifest)
+            generated = True
+        except Exception:
+            logger.exception(f"Failed to render derivatives of {filename}")
+    if generated:
+        # Cached project payloads carry srcset values derived from the manifests
+        project_cache.invalidate()
+
+
+def remove_derivatives(filename: str) -> None:
+    """Delete the variants, manifest and cached resizes of an upload."""
+    _manifests.pop(filename, None)
+    # The full name: a.jpg and a.jpeg of the same content are separate uploads
+    for path in VARIANTS_DIR.glob(f"{glob.escape(filename)}.*"):
+        path.unlink(missing_ok=True)
+    resize_cache.remove(filename)
+
+
+# ============== On-demand resizing ==============
+
+class ResizeCache:
+    """
+    Disk cache of on-demand image sizes.
+
+    Entries are named ``{filename}.{width}x{height}.{format}`` and rendered in the
+    process pool on first request. Concurrent requests for one entry share a
+    single render: in-process through a future, across app workers through a
+    file lock taken by the renderer. Hits refresh the file's access time, and
+    after every render the least recently used entries are evicted until the
+    directory fits ``max_bytes`` again. The mtime is never touched: the
+    response's ETag and Last-Modified are derived from it.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int, quality: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.quality = quality
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def entry_name(self, filename: str, size: Tuple[int, int], fmt: str) -> str:
+        return f"{filename}.{size[0]}x{size[1]}.{fmt}"
+
+    async def get(self, filename: str, size: Tuple[int, int], fmt: str) -> Path:
+        """
+        Path of the cached rendering, rendering it first if needed.
+
+        Args:
+            filename: Upload name inside UPLOAD_DIR
+            size: Bounding box (width, height); 0 leaves that side unconstrained
+            fmt: Key of ``RESIZE_FORMATS``
+
+        Returns:
+            Path of the cache file
+        """
+        name = self.entry_name(filename, size, fmt)
+        path = self.directory / name
+        try:
+            # LRU by atime, set explicitly so noatime mounts work too; the
+            # mtime is kept so the entry's validators stay the same
+            os.utime(path, ns=(time.time_ns(), os.stat(path).st_mtime_ns))
+            return path
+        except FileNotFoundError:
+            pass
+
+        future = self._inflight.get(name)
+        if future is None:
+            future = asyncio.ensure_future(self._render(filename, name, size, fmt))
+            self._inflight[name] = future
+            future.add_done_callback(lambda _: self._inflight.pop(name, None))
+        # Shielded: a client disconnect must not cancel a render others wait on
+        await asyncio.shield(future)
+        return path
+
+    async def _render(self, filename: str, name: str, size: Tuple[int, int], fmt: str) -> None:
+        stripe = zlib.crc32(name.encode()) % RESIZE_LOCK_STRIPES
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            _get_pool(),
+            render_resized,
+            str(UPLOAD_DIR / filename),
+            str(self.directory / name),
+            str(self.directory / f".lock-{stripe}"),
+            size,
+            fmt,
+            self.quality,
+        )
+        await asyncio.to_thread(self.evict, name)
+
+    def evict(self, keep: Optional[str] = None) -> None:
+        """
+        Drop least recently used entries until the cache fits its budget.
+        ``keep`` (the entry just rendered) is never dropped.
+        """
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.startswith(".") or entry.name == keep or not entry.is_file():
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_atime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            Path(path).unlink(missing_ok=True)
+            total -= size
+
+    def remove(self, filename: str) -> None:
+        """Delete every cached size of one upload."""
+        for path in self.directory.glob(f"{glob.escape(filename)}.*"):
+            path.unlink(missing_ok=True)
+
+
+resize_cache = ResizeCache(
+    directory=Path(settings.IMAGE_RESIZE_CACHE_DIR),
+    max_bytes=settings.IMAGE_RESIZE_CACHE_BYTES,
+    quality=settings.IMAGE_DERIVATIVE_QUALITY,
+)
+
+
+@lru_cache(maxsize=1)
+def resize_formats() -> List[str]:
+    """Formats ``?fmt=`` accepts with the installed Pillow."""
+    from PIL import Image
+
+    Image.init()
+    return [fmt for fmt, pil_format in RESIZE_FORMATS.items() if pil_format in Image.SAVE]
+
+
+# ============== Lookups ==============
+
+_manifests: Dict[str, Dict] = {}
+
+
+def upload_name(image_url: Optional[str]) -> Optional[str]:
+    """File name of a top-level /uploads/ URL, or None for anything else."""
+    if not image_url or not image_url.startswith("/uploads/"):
+        return None
+    name = image_url[len("/uploads/"):]
+    return name if name and "/" not in name else None
+
+
+def manifest_path(filename: str) -> Path:
+    return VARIANTS_DIR / f"{filename}.json"
+
+
+def _read_manifests(filenames: List[str]) -> Dict[str, Dict]:
+    manifests = {}
+    for filename in filenames:
+        try:
+            manifests[filename] = json.loads(manifest_path(filename).read_text())
+        except (OSError, ValueError):
+            pass
+    return manifests
+
+
+def _remember_manifest(filename: str, manifest: Dict) -> None:
+    # A fingerprinted upload's variants never change; only deletes drop them
+    _manifests.pop(filename, None)
+    if len(_manifests) >= MANIFEST_CACHE_SIZE:
+        _manifests.pop(next(iter(_manifests)))
+    _manifests[filename] = manifest
+
+
+async def load_manifests(image_urls: Iterable[Optional[str]]) -> Dict[str, Dict]:
+    """
+    Manifests of the given /uploads/ images by URL, reading the ones not in
+    memory yet in a worker thread. Images without variants (yet) are left out.
+    """
+    names = {url: name for url in image_urls if (name := upload_name(url))}
+    missing = sorted({name for name in names.values() if name not in _manifests})
+    if missing:
+        # Not found manifests are not remembered: another worker may still render them
+        for filename, manifest in (await asyncio.to_thread(_read_manifests, missing)).items():
+            _remember_manifest(filename, manifest)
+    return {url: _manifests[name] for url, name in names.items() if name in _manifests}
+
+
+async def load_manifest(image_url: Optional[str]) -> Optional[Dict]:
+    """Manifest of an /uploads/ image, or None if it has no variants (yet)."""
+    return (await load_manifests([image_url])).get(image_url)
+
+
+def cached_manifest(image_url: Optional[str]) -> Optional[Dict]:
+    """Manifest already loaded by ``load_manifests``; never touches the disk."""
+    return _manifests.get(upload_name(image_url))
+
+
+def build_srcset(manifest: Optional[Dict], fmt: str = "webp") -> Optional[str]:
+    """``srcset`` attribute value listing every width of one format."""
+    if not manifest:
+        return None
+    entries = [f"{v['url']} {v['width']}w" for v in manifest["variants"] if v["format"] == fmt]
+    return ", ".join(entries) or None
+
+
+def thumbnail_url(image_url: Optional[str], width: int) -> Optional[str]:
+    """
+    URL of the smallest WebP variant at least ``width`` pixels wide,
+    falling back to the original while variants are missing or their
+    manifest has not been loaded with ``load_manifests``.
+    """
+    manifest = cached_manifest(image_url)
+    if not manifest:
+        return image_url
+    candidates = sorted(
+        (v for v in manifest["variants"] if v["format"] == VARIANT_FORMATS[0]),
+        key=lambda v: v["width"],
+    )
+    for variant in candidates:
+        if variant["width"] >= width:
+            return variant["url"]
+    return candidates[-1]["url"] if candidates else image_url
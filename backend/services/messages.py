@@ -1,12 +1,142 @@
+import asyncio
+import logging
+from typing import List, Optional
+
+from core.config import settings
+from db.session import async_session
 from repositories.messages import MessageRepository
 from schemas.messages import MessageCreate
 from db.models import Message
 
+logger = logging.getLogger(__name__)
+
+# Attempts at storing a whole batch before falling back to one row at a time
+WRITE_ATTEMPTS = 3
+RETRY_DELAY = 0.5
+
+
+class QueueFullError(Exception):
+    """Raised when the contact message queue cannot take more messages"""
+    pass
+
+
+class MessageIngestQueue:
+    """
+    Write-behind queue for contact form messages.
+
+    Requests only validate and enqueue; a background task collects queued
+    messages until ``batch_size`` is reached or ``flush_interval`` seconds have
+    passed since the first one, then stores them with a single multi-row
+    INSERT. The queue is bounded so a burst turns into back-pressure instead
+    of unbounded memory.
+    """
+
+    def __init__(self, max_size: int, batch_size: int, flush_interval: float):
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._batch: List[MessageCreate] = []
+        self._inflight: Optional[asyncio.Future] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._task = asyncio.create_task(self._run())
+
+    def put(self, msg: MessageCreate) -> None:
+        try:
+            self._queue.put_nowait(msg)
+        except asyncio.QueueFull:
+            raise QueueFullError("Contact message queue is full")
+
+    async def stop(self) -> None:
+        """Stop the background task and flush everything still queued."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        if self._inflight is not None:
+            await asyncio.gather(self._inflight, return_exceptions=True)
+
+        pending, self._batch = self._batch, []
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        for start in range(0, len(pending), self.batch_size):
+            await self._write(pending[start:start + self.batch_size])
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            self._batch.append(await self._queue.get())
+            deadline = loop.time() + self.flush_interval
+            while len(self._batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    self._batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            batch, self._batch = self._batch, []
+            # Shielded so a shutdown never interrupts a batch halfway through
+            self._inflight = asyncio.ensure_future(self._write(batch))
+            await asyncio.shield(self._inflight)
+
+    async def _write(self, batch: List[MessageCreate]) -> None:
+        """
+        Store a batch, retrying transient failures (e.g. a locked SQLite
+        database). If the batch keeps failing, rows are stored one by one so
+        a single bad row only loses itself.
+        """
+        for attempt in range(1, WRITE_ATTEMPTS + 1):
+            try:
+                await self._insert(batch)
+                return
+            except Exception:
+                logger.warning(
+                    f"Storing {len(batch)} contact message(s) failed (attempt {attempt}/{WRITE_ATTEMPTS})",
+                    exc_info=True,
+                )
+                if attempt < WRITE_ATTEMPTS:
+                    await asyncio.sleep(RETRY_DELAY * attempt)
+
+        stored = 0
+        for msg in batch:
+            try:
+                await self._insert([msg])
+                stored += 1
+            except Exception:
+                logger.exception(f"Dropped contact message from {msg.email}")
+        logger.info(f"Stored {stored} of {len(batch)} contact message(s) one by one")
+
+    async def _insert(self, batch: List[MessageCreate]) -> None:
+        async with async_session() as session:
+            await MessageRepository(session).create_many(batch)
+
+
+message_queue = MessageIngestQueue(
+    max_size=settings.MESSAGE_QUEUE_MAX_SIZE,
+    batch_size=settings.MESSAGE_BATCH_SIZE,
+    flush_interval=settings.MESSAGE_FLUSH_INTERVAL_MS / 1000,
+)
+
+
 class MessageService:
-    def __init__(self, repository: MessageRepository):
+    def __init__(self, repository: MessageRepository, queue: MessageIngestQueue = message_queue):
         self.repository = repository
+        self.queue = queue
 
-    async def send_message(self, msg: MessageCreate) -> Message:
+    async def send_message(self, msg: MessageCreate) -> Optional[Message]:
         # Business logic can go here (e.g. email notification)
-        return await self.repository.create(msg)
-
+        if not self.queue.running:
+            # Queue is only running inside the application lifespan
+            return await self.repository.create(msg)
+        self.queue.put(msg)
+        return None
@@ -1,7 +1,11 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from fastapi import HTTPException
+from sqlalchemy import Row
+from core.cache import CachedPayload, dump_json, join_json_array, project_cache
+from core.profiling import serialization_timer
 from repositories.projects import ProjectRepository
-from schemas.projects import ProjectCreate, ProjectUpdate
+from schemas.projects import ProjectCreate, ProjectOut, ProjectUpdate
+from services.images import build_srcset, load_manifests
 from db.models import Project
 
 
@@ -18,21 +22,82 @@ class ProjectService:
     async def get_project_by_slug(self, slug: str) -> Optional[Project]:
         return await self.repository.get_by_slug(slug)
 
-    async def create_project(self, data: ProjectCreate) -> Project:
+    # Cached JSON payloads for the public endpoints
+
+    async def get_projects_json(self, featured_only: bool = False) -> CachedPayload:
+        key = ("list", featured_only)
+        payload, generation = project_cache.get(key)
+        if payload is None:
+            projects = await self.repository.get_all_rows(featured_only)
+            manifests = await load_manifests(p.image_url for p in projects)
+            with serialization_timer():
+                items = [_project_item(project, manifests) for project in projects]
+                body = join_json_array(item.body for item in items)
+            # No Last-Modified: deleting or un-featuring a project changes the list
+            # without a newer timestamp in it, so only the ETag validates lists
+            payload = project_cache.set(key, CachedPayload.build(body), generation)
+            # The detail endpoints serve the same bytes as the list entries
+            for project, item in zip(projects, items):
+                project_cache.set(("id", project.id), item, generation)
+                project_cache.set(("slug", project.slug), item, generation)
+        return payload
+
+    async def get_project_json(self, project_id: int) -> Optional[CachedPayload]:
+        key = ("id", project_id)
+        payload, generation = project_cache.get(key)
+        if payload is None:
+            project = await self.repository.get_row_by_id(project_id)
+            if not project:
+                return None
+            manifests = await load_manifests([project.image_url])
+            with serialization_timer():
+                payload = project_cache.set(key, _project_item(project, manifests), generation)
+        return payload
+
+    async def get_project_by_slug_json(self, slug: str) -> Optional[CachedPayload]:
+        key = ("slug", slug)
+        payload, generation = project_cache.get(key)
+        if payload is None:
+            project = await self.repository.get_row_by_slug(slug)
+            if not project:
+                return None
+            manifests = await load_manifests([project.image_url])
+            with serialization_timer():
+                payload = project_cache.set(key, _project_item(project, manifests), generation)
+        return payload
+
+    async def create_project(self, data: ProjectCreate) -> ProjectOut:
         if await self.repository.slug_exists(data.slug):
             raise HTTPException(status_code=400, detail=f"Проект с slug '{data.slug}' уже существует")
-        return await self.repository.create(data)
+        project = await self.repository.create(data)
+        project_cache.invalidate()
+        return await _project_out(project)
 
-    async def update_project(self, project_id: int, data: ProjectUpdate) -> Project:
+    async def update_project(self, project_id: int, data: ProjectUpdate) -> ProjectOut:
         if data.slug and await self.repository.slug_exists(data.slug, exclude_id=project_id):
             raise HTTPException(status_code=400, detail=f"Проект с slug '{data.slug}' уже существует")
         project = await self.repository.update(project_id, data)
         if not project:
             raise HTTPException(status_code=404, detail="Проект не найден")
-        return project
+        project_cache.invalidate()
+        return await _project_out(project)
 
     async def delete_project(self, project_id: int) -> bool:
         if not await self.repository.delete(project_id):
             raise HTTPException(status_code=404, detail="Проект не найден")
+        project_cache.invalidate()
         return True
 
+
+async def _project_out(project: Project) -> ProjectOut:
+    manifests = await load_manifests([project.image_url])
+    return ProjectOut.model_validate(project).model_copy(
+        update={"image_srcset": build_srcset(manifests.get(project.image_url))}
+    )
+
+
+def _project_item(project: Row, manifests: Dict[str, Dict]) -> CachedPayload:
+    # Same shape as ProjectOut: the selected columns plus the srcset
+    item = project._asdict()
+    item["image_srcset"] = build_srcset(manifests.get(project.image_url))
+    return CachedPayload.build(dump_json(item), project.updated_at or project.created_at)
@@ -1,7 +1,13 @@
 from typing import Optional
+from pydantic import TypeAdapter
+from core.cache import CachedPayload, settings_cache
+from core.profiling import serialization_timer
 from repositories.settings import SettingsRepository
+from schemas.settings import SettingsOut
 from db.models import Settings as SettingsModel
 
+_setting_adapter = TypeAdapter(SettingsOut)
+
 class SettingsService:
     def __init__(self, repository: SettingsRepository):
         self.repository = repository
@@ -9,3 +15,15 @@ class SettingsService:
     async def get_setting(self, key: str) -> Optional[SettingsModel]:
         return await self.repository.get_by_key(key)
 
+    async def get_setting_json(self, key: str) -> Optional[CachedPayload]:
+        payload, generation = settings_cache.get(key)
+        if payload is None:
+            setting = await self.repository.get_by_key(key)
+            if not setting:
+                return None
+            with serialization_timer():
+                body = _setting_adapter.dump_json(
+                    _setting_adapter.validate_python(setting, from_attributes=True)
+                )
+            payload = settings_cache.set(key, CachedPayload.build(body), generation)
+        return payload
@@ -1,4 +1,6 @@
 from typing import List, Optional
+from core.cache import CachedPayload, dump_json, skill_cache
+from core.profiling import serialization_timer
 from repositories.skills import SkillRepository
 from db.models import Skill
 
@@ -9,3 +11,12 @@ class SkillService:
     async def get_skills(self, category: Optional[str] = None) -> List[Skill]:
         return await self.repository.get_all(category)
 
+    async def get_skills_json(self, category: Optional[str] = None) -> CachedPayload:
+        payload, generation = skill_cache.get(category)
+        if payload is None:
+            skills = await self.repository.get_all_rows(category)
+            with serialization_timer():
+                # Rows carry exactly the SkillOut columns
+                body = dump_json([skill._asdict() for skill in skills])
+            payload = skill_cache.set(category, CachedPayload.build(body), generation)
+        return payload
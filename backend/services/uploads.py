@@ -0,0 +1,333 @@
+"""
+Storage helpers for uploaded files.
+
+Request bodies are copied to disk in fixed-size chunks: the size limit is
+enforced while streaming so oversized files are rejected early, writes run in
+the thread pool so the event loop stays responsive, and a file only appears
+under its final name once it has been written completely.
+
+Content is hashed while it streams and kept once in the blob store
+(services/blobs.py); the name under uploads/ is a hard link to the blob and
+is recorded as a blob reference in the database.
+
+Stored names are fingerprints of the content (``{sha256[:20]}{ext}``), so
+the file behind a URL never changes and can be cached by browsers forever.
+Replacing an image produces a new URL, and the rows pointing at the old one
+are rewritten.
+
+Every stored file is also recorded in the ``uploads`` index table (size,
+MIME type, dimensions, digest), which listings page through instead of
+scanning the directory.
+"""
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import BinaryIO, Iterable, List, NamedTuple, Set, Tuple
+
+from fastapi import UploadFile
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from db.models import GalleryImage, Project
+from repositories.blobs import BlobRepository
+from repositories.uploads import UploadRepository
+from services.blobs import blob_store
+from services.images import image_dimensions, remove_derivatives
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_DIR = Path("uploads")
+UPLOAD_DIR.mkdir(exist_ok=True)
+
+ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg"}
+MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
+
+CHUNK_SIZE = 64 * 1024
+
+# In-flight uploads live next to their destination so the final rename is atomic
+TEMP_PREFIX = ".upload-"
+
+# Hex digits of the content hash used as the file name
+FINGERPRINT_LENGTH = 20
+# Also matches derived variants such as {fingerprint}.jpg.w480.webp
+FINGERPRINT_RE = re.compile(rf"^[0-9a-f]{{{FINGERPRINT_LENGTH}}}(\.[a-z0-9]+\.w\d+)?\.[a-z0-9]+$")
+
+
+class UploadError(Exception):
+    """Raised when an uploaded file cannot be stored"""
+    pass
+
+
+class FileTooLargeError(UploadError):
+    """Raised when an upload exceeds its size limit"""
+    pass
+
+
+class StoredUpload(NamedTuple):
+    """Upload materialized under uploads/ from the blob store."""
+    filename: str
+    size: int
+    sha256: str
+
+    @property
+    def ref_path(self) -> str:
+        return upload_ref_path(self.filename)
+
+
+def upload_ref_path(filename: str) -> str:
+    """Blob reference key of a file in uploads/."""
+    return (UPLOAD_DIR / filename).as_posix()
+
+
+def fingerprint_name(sha256: str, ext: str) -> str:
+    return f"{sha256[:FINGERPRINT_LENGTH]}{ext}"
+
+
+def is_fingerprinted(filename: str) -> bool:
+    """True for names derived from the content, which therefore never change."""
+    # Variant manifests ({fingerprint}.jpg.json) do not match: they may be re-rendered
+    return FINGERPRINT_RE.match(filename) is not None
+
+
+async def stream_to_temp(file: UploadFile, directory: Path, max_size: int) -> Tuple[Path, int, str]:
+    """
+    Copy an upload into a temporary file inside ``directory``.
+
+    Args:
+        file: Uploaded file
+        directory: Directory for the temporary file
+        max_size: Maximum allowed size in bytes
+
+    Returns:
+        Path to the temporary file, the number of bytes written and the
+        SHA-256 hex digest of the content
+
+    Raises:
+        FileTooLargeError: As soon as more than ``max_size`` bytes were received
+    """
+    fd, tmp_name = tempfile.mkstemp(dir=directory, prefix=TEMP_PREFIX, suffix=".part")
+    tmp_path = Path(tmp_name)
+    digest = hashlib.sha256()
+    size = 0
+
+    def write(out, chunk: bytes) -> None:
+        digest.update(chunk)
+        out.write(chunk)
+
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := await file.read(CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_size:
+                    raise FileTooLargeError(
+                        f"File too large (max {max_size // 1024 // 1024}MB)"
+                    )
+                await run_in_threadpool(write, out, chunk)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return tmp_path, size, digest.hexdigest()
+
+
+def _store_blob(tmp_path: Path, sha256: str, dest: Path) -> None:
+    blob_store.ingest(tmp_path, sha256)
+    # A fingerprinted name that already exists has exactly this content
+    if not dest.exists():
+        blob_store.materialize(sha256, dest)
+
+
+async def save_upload(
+    file: UploadFile,
+    directory: Path = UPLOAD_DIR,
+    max_size: int = MAX_FILE_SIZE,
+) -> StoredUpload:
+    """
+    Stream an upload into the blob store and link it into ``directory``
+    under its content fingerprint. Identical content is stored only once
+    and gets the same name.
+
+    The caller records the reference with ``register_uploads`` and commits.
+
+    Returns:
+        Stored filename, size in bytes and content digest
+    """
+    ext = Path(file.filename).suffix.lower()
+    tmp_path, size, sha256 = await stream_to_temp(file, blob_store.root, max_size)
+    filename = fingerprint_name(sha256, ext)
+    await run_in_threadpool(_store_blob, tmp_path, sha256, directory / filename)
+    return StoredUpload(filename, size, sha256)
+
+
+def index_row(path: Path, size: int, sha256: str, created_at: datetime) -> dict:
+    """Row of the uploads index for one file (reads the image header)."""
+    width, height = image_dimensions(path)
+    return {
+        "filename": path.name,
+        "size": size,
+        "mime_type": mimetypes.guess_type(path.name)[0] or "application/octet-stream",
+        "width": width,
+        "height": height,
+        "sha256": sha256,
+        "created_at": created_at,
+    }
+
+
+async def register_uploads(db: AsyncSession, uploads: Iterable[StoredUpload]) -> None:
+    """Record blob references and index rows for stored uploads (the caller commits)."""
+    uploads = list(uploads)
+    await BlobRepository(db).add_refs(
+        (upload.ref_path, upload.sha256, upload.size) for upload in uploads
+    )
+    now = datetime.now(timezone.utc)
+    rows = await run_in_threadpool(lambda: [
+        index_row(UPLOAD_DIR / upload.filename, upload.size, upload.sha256, now)
+        for upload in uploads
+    ])
+    await UploadRepository(db).add_many(rows)
+
+
+def _hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _scan_upload_dir() -> List[dict]:
+    rows = []
+    with os.scandir(UPLOAD_DIR) as it:
+        for entry in it:
+            # Skips temp files, the blob store, resize cache and variants/
+            if entry.name.startswith(".") or not entry.is_file():
+                continue
+            path = Path(entry.path)
+            stat = entry.stat()
+            created_at = datetime.fromtimestamp(stat.st_mtime, timezone.utc)
+            rows.append(index_row(path, stat.st_size, _hash_file(path), created_at))
+    return rows
+
+
+async def backfill_upload_index(db: AsyncSession) -> int:
+    """
+    Index the files already in uploads/ when the index is still empty
+    (first start after the table was added). Commits the session.
+
+    Returns:
+        Number of files indexed
+    """
+    repository = UploadRepository(db)
+    if not await repository.is_empty():
+        return 0
+    rows = await run_in_threadpool(_scan_upload_dir)
+    for start in range(0, len(rows), 500):
+        await repository.add_many(rows[start:start + 500])
+    # One transaction: an interrupted backfill leaves the index empty and is redone
+    await db.commit()
+    logger.info(f"Indexed {len(rows)} existing upload(s)")
+    return len(rows)
+
+
+async def referenced_uploads(db: AsyncSession, filenames: Iterable[str]) -> Set[str]:
+    """
+    Subset of ``filenames`` still used as a project cover or gallery image.
+    Names are content fingerprints, so one file can back several records.
+    """
+    urls = {f"/uploads/{name}": name for name in filenames}
+    if not urls:
+        return set()
+    referenced = set()
+    for model in (Project, GalleryImage):
+        result = await db.execute(select(model.image_url).where(model.image_url.in_(urls)))
+        referenced.update(urls[url] for url in result.scalars())
+    return referenced
+
+
+async def delete_uploads(db: AsyncSession, filenames: Iterable[str]) -> None:
+    """
+    Delete files from uploads/ and release their blob references, removing
+    blobs nobody references anymore. Commits the session.
+    """
+    filenames = list(filenames)
+    orphaned = await BlobRepository(db).release(paths=[upload_ref_path(name) for name in filenames])
+    await UploadRepository(db).delete_many(filenames)
+    await db.commit()
+
+    def remove() -> None:
+        for name in filenames:
+            (UPLOAD_DIR / name).unlink(missing_ok=True)
+            remove_derivatives(name)
+        blob_store.remove(orphaned)
+
+    await run_in_threadpool(remove)
+
+
+async def discard_uploads(db: AsyncSession, uploads: List[StoredUpload]) -> None:
+    """
+    Remove uploads whose references were never committed (e.g. the rows
+    using them failed to insert). Files and blobs that were already known
+    before (same content uploaded earlier) are kept.
+    """
+    digests = {upload.sha256 for upload in uploads}
+    known = await BlobRepository(db).existing(digests)
+    referenced = await BlobRepository(db).referenced_paths(upload.ref_path for upload in uploads)
+
+    def remove() -> None:
+        for upload in uploads:
+            if upload.ref_path not in referenced:
+                (UPLOAD_DIR / upload.filename).unlink(missing_ok=True)
+        blob_store.remove(digests - known)
+
+    await run_in_threadpool(remove)
+
+
+def _reopen_spooled(file: BinaryIO) -> BinaryIO:
+    # fileno() rolls an in-memory spool over to its temp file first
+    handle = os.fdopen(os.dup(file.fileno()), "rb")
+    handle.seek(0)
+    return handle
+
+
+async def detach_upload(file: UploadFile) -> BinaryIO:
+    """
+    Open an independent read handle on the temp file Starlette spooled the
+    upload into, without copying it.
+
+    The handle stays valid after the request's form data is closed, so the
+    upload can still be processed while a streaming response is being sent.
+    The caller is responsible for closing it.
+    """
+    return await run_in_threadpool(_reopen_spooled, file.file)
+
+
+async def replace_upload(db: AsyncSession, old_filename: str, stored: StoredUpload) -> int:
+    """
+    Point every project cover and gallery image using ``old_filename`` at a
+    newly stored upload, then delete the old file. Commits the session.
+
+    Returns:
+        Number of rows rewritten
+    """
+    old_url, new_url = f"/uploads/{old_filename}", f"/uploads/{stored.filename}"
+    rewritten = 0
+    for model in (Project, GalleryImage):
+        result = await db.execute(
+            update(model)
+            .where(model.image_url == old_url)
+            .values(image_url=new_url)
+            .execution_options(synchronize_session=False)
+        )
+        rewritten += result.rowcount
+    await register_uploads(db, [stored])
+
+    if old_filename == stored.filename:
+        await db.commit()
+    else:
+        await delete_uploads(db, [old_filename])
+    return rewritten
@@ -3,17 +3,61 @@ ZipExtractService - Service for extracting ZIP archives for static projects.
 
 Handles extraction of ZIP files to /static-projects/{slug}/ directory
 with validation to prevent malicious files.
+
+The archive is opened once: its central directory is validated and the
+entries are extracted in the same pass. Extraction is blocking and meant to
+run in a worker thread.
+
+Every upload becomes an immutable build in
+``static-projects/.builds/{slug}/{build_id}``, where the build id is a hash
+of the archive's central directory. ``static-projects/{slug}`` is a symlink
+to the active build and is switched with an atomic rename, so visitors never
+see a missing or half-written project. The last
+``STATIC_PROJECT_BUILDS_KEEP`` builds are kept for rollback; older ones are
+removed by ``collect_garbage`` outside the request.
+
+When the blob store is on the same filesystem, extracted files are streamed
+into it and hard-linked into the build, so assets shared between builds and
+projects (fonts, libraries, images) are stored once. The returned
+``PublishedBuild.refs`` must then be recorded as blob references.
 """
 
+import gzip
+import hashlib
 import os
+import tempfile
+import time
+import uuid
 import zipfile
 import shutil
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Set
+from typing import BinaryIO, Callable, Dict, List, Optional, Set, Tuple, Union
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional, gzip alone still works
+    brotli = None
+
+from core.config import settings
+from services.blobs import BlobStore, blob_store
 
 # Directory where static projects are extracted
 STATIC_PROJECTS_DIR = Path("static-projects")
 
+# Versioned builds live under static-projects/.builds/{slug}/{build_id}
+BUILDS_DIRNAME = ".builds"
+
+# Unfinished extractions inside a project's builds directory
+STAGING_PREFIX = ".staging-"
+
+# Staging directories older than this are leftovers of a crashed publish
+STALE_STAGING_AGE = 3600
+
+# Name given to a project directory that predates versioned builds
+LEGACY_BUILD_ID = "legacy"
+
 # Allowed file extensions for static projects
 ALLOWED_EXTENSIONS: Set[str] = {
     # Web files
@@ -39,6 +83,17 @@ MAX_ZIP_SIZE = 50 * 1024 * 1024
 # Maximum number of files in archive
 MAX_FILES_COUNT = 500
 
+# Text assets that get precompressed .gz/.br siblings at extraction time
+COMPRESSIBLE_EXTENSIONS: Set[str] = {
+    ".html", ".htm", ".css", ".js", ".json", ".svg", ".map", ".xml", ".txt",
+}
+
+# Files smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 256
+
+# Called as progress(stage, done, total) while a project is published
+ProgressCallback = Callable[[str, int, int], None]
+
 
 class ZipExtractionError(Exception):
     """Base exception for ZIP extraction errors."""
@@ -60,18 +115,38 @@ class ZipTooLargeError(ZipExtractionError):
     pass
 
 
+class BuildNotFoundError(ZipExtractionError):
+    """Raised when a requested build of a static project does not exist."""
+    pass
+
+
+@dataclass
+class PublishedBuild:
+    """Result of publishing a ZIP archive."""
+    path: Path
+    build_id: str
+    # False when an identical build already existed and was re-activated
+    created: bool
+    # (path, sha256, size) of every file hard-linked from the blob store
+    refs: List[Tuple[str, str, int]] = field(default_factory=list)
+
+
 class ZipExtractService:
     """Service for extracting ZIP archives for static projects."""
     
-    def __init__(self, base_dir: Path = STATIC_PROJECTS_DIR):
+    def __init__(self, base_dir: Path = STATIC_PROJECTS_DIR, blobs: Optional[BlobStore] = blob_store):
         """
         Initialize the service.
         
         Args:
             base_dir: Base directory for extracted projects
+            blobs: Blob store for deduplicated files (None to always extract plain copies)
         """
         self.base_dir = base_dir
-        self.base_dir.mkdir(exist_ok=True)
+        self.builds_dir = base_dir / BUILDS_DIRNAME
+        self.builds_dir.mkdir(parents=True, exist_ok=True)
+        # Hard links cannot cross filesystems; copies would only double the storage
+        self.blobs = blobs if blobs is not None and blobs.shares_device(self.builds_dir) else None
     
     def validate_zip_contents(self, zip_path: Path) -> None:
         """
@@ -85,32 +160,40 @@ class ZipExtractService:
             MaliciousFileError: If ZIP contains dangerous files
             ZipTooLargeError: If ZIP exceeds size limits
         """
-        if not zipfile.is_zipfile(zip_path):
-            raise InvalidZipError("File is not a valid ZIP archive")
-        
         try:
             with zipfile.ZipFile(zip_path, 'r') as zf:
-                # Check for ZIP bomb (too many files)
-                file_list = zf.namelist()
-                if len(file_list) > MAX_FILES_COUNT:
-                    raise ZipTooLargeError(
-                        f"ZIP contains too many files ({len(file_list)} > {MAX_FILES_COUNT})"
-                    )
-                
-                # Calculate total uncompressed size
-                total_size = sum(info.file_size for info in zf.infolist())
-                if total_size > MAX_ZIP_SIZE:
-                    raise ZipTooLargeError(
-                        f"ZIP uncompressed size exceeds limit ({total_size} > {MAX_ZIP_SIZE})"
-                    )
-                
-                # Check each file
-                for filename in file_list:
-                    self._validate_filename(filename)
-                    
+                self._validate_entries(zf.infolist())
         except zipfile.BadZipFile as e:
             raise InvalidZipError(f"Corrupted ZIP file: {e}")
     
+    def _validate_entries(self, entries: List[zipfile.ZipInfo]) -> None:
+        """
+        Validate the central directory of an opened archive.
+        
+        Args:
+            entries: Archive members from ``ZipFile.infolist()``
+            
+        Raises:
+            MaliciousFileError: If ZIP contains dangerous files
+            ZipTooLargeError: If ZIP exceeds size limits
+        """
+        # Check for ZIP bomb (too many files)
+        if len(entries) > MAX_FILES_COUNT:
+            raise ZipTooLargeError(
+                f"ZIP contains too many files ({len(entries)} > {MAX_FILES_COUNT})"
+            )
+        
+        # Calculate total uncompressed size
+        total_size = sum(info.file_size for info in entries)
+        if total_size > MAX_ZIP_SIZE:
+            raise ZipTooLargeError(
+                f"ZIP uncompressed size exceeds limit ({total_size} > {MAX_ZIP_SIZE})"
+            )
+        
+        # Check each file
+        for info in entries:
+            self._validate_filename(info.filename)
+    
     def _validate_filename(self, filename: str) -> None:
         """
         Validate a single filename from the archive.
@@ -146,62 +229,358 @@ class ZipExtractService:
                 f"File type not allowed: {filename} (extension: {ext})"
             )
     
-    def extract_zip(self, zip_path: Path, slug: str) -> Path:
+    def extract_zip(
+        self,
+        source: Union[Path, BinaryIO],
+        slug: str,
+        progress: Optional[ProgressCallback] = None,
+    ) -> Path:
         """
-        Extract ZIP archive to /static-projects/{slug}/.
+        Extract ZIP archive as a new build and publish it at /static-projects/{slug}/.
         
         Args:
-            zip_path: Path to the ZIP file
+            source: Path to the ZIP file or a seekable binary file object
+            slug: Project slug for the destination directory
+            progress: Optional callback receiving (stage, done, total)
+            
+        Returns:
+            Path to the published project directory
+            
+        Raises:
+            ZipExtractionError: If validation or extraction fails
+        """
+        return self.publish_zip(source, slug, progress).path
+    
+    def publish_zip(
+        self,
+        source: Union[Path, BinaryIO],
+        slug: str,
+        progress: Optional[ProgressCallback] = None,
+        ingested: Optional[Set[str]] = None,
+    ) -> PublishedBuild:
+        """
+        Extract ZIP archive as a new build and publish it at /static-projects/{slug}/.
+        
+        Uploading an archive identical to an existing build re-activates that
+        build without extracting it again.
+        
+        Args:
+            source: Path to the ZIP file or a seekable binary file object
             slug: Project slug for the destination directory
+            progress: Optional callback receiving (stage, done, total)
+                for the "extracting" and "compressing" stages
+            ingested: Receives the digest of every blob written to the store,
+                also when extraction fails halfway, so the caller can remove
+                the ones that end up without a reference
             
         Returns:
-            Path to the extracted directory
+            The published build, including blob references to record
             
         Raises:
-            ZipExtractionError: If extraction fails
+            ZipExtractionError: If validation or extraction fails
+        """
+        _check_name(slug, "project slug")
+        try:
+            with zipfile.ZipFile(source, 'r') as zf:
+                entries = zf.infolist()
+                # Validate before extraction
+                self._validate_entries(entries)
+                
+                build_id = self._build_id(entries)
+                build_dir = self.builds_dir / slug / build_id
+                refs = []
+                created = not build_dir.is_dir()
+                if created:
+                    refs = self._extract_build(zf, entries, build_dir, progress, ingested)
+                else:
+                    # Same content as an earlier upload: it becomes the newest build again
+                    os.utime(build_dir)
+            
+            path = self.activate_build(slug, build_id)
+            return PublishedBuild(path=path, build_id=build_id, created=created, refs=refs)
+        except ZipExtractionError:
+            raise
+        except zipfile.BadZipFile as e:
+            raise InvalidZipError(f"Corrupted ZIP file: {e}")
+        except Exception as e:
+            raise ZipExtractionError(f"Failed to extract ZIP: {e}")
+    
+    @staticmethod
+    def _build_id(entries: List[zipfile.ZipInfo]) -> str:
+        """Content hash of an archive from its central directory (names, sizes, CRCs)."""
+        digest = hashlib.sha256()
+        for info in entries:
+            digest.update(f"{info.filename}\0{info.file_size}\0{info.CRC}\n".encode())
+        return digest.hexdigest()[:16]
+    
+    def _extract_build(
+        self,
+        zf: zipfile.ZipFile,
+        entries: List[zipfile.ZipInfo],
+        build_dir: Path,
+        progress: Optional[ProgressCallback],
+        ingested: Optional[Set[str]] = None,
+    ) -> List[Tuple[str, str, int]]:
+        """
+        Extract and precompress into a staging directory, then rename it to ``build_dir``.
+        
+        Returns:
+            Blob references (path, sha256, size) of the extracted files
+        """
+        build_dir.parent.mkdir(parents=True, exist_ok=True)
+        staging_dir = Path(tempfile.mkdtemp(dir=build_dir.parent, prefix=STAGING_PREFIX))
+        try:
+            linked = self._extract_entries(zf, entries, staging_dir, progress, ingested)
+            self.precompress_assets(staging_dir, progress)
+            # mkdtemp creates owner-only directories; projects are public
+            staging_dir.chmod(0o755)
+            try:
+                os.replace(staging_dir, build_dir)
+            except OSError:
+                # A concurrent upload of the same archive finished first
+                if not build_dir.is_dir():
+                    raise
+                shutil.rmtree(staging_dir, ignore_errors=True)
+                return []
+        except Exception:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
+        
+        return [
+            ((build_dir / name).as_posix(), sha256, size) for name, sha256, size in linked
+        ]
+    
+    def _extract_entries(
+        self,
+        zf: zipfile.ZipFile,
+        entries: List[zipfile.ZipInfo],
+        dest_dir: Path,
+        progress: Optional[ProgressCallback],
+        ingested: Optional[Set[str]] = None,
+    ) -> List[Tuple[str, str, int]]:
+        """
+        Extract already validated entries, reporting uncompressed bytes written.
+        
+        Returns:
+            (relative name, sha256, size) of files linked from the blob store
         """
-        # Validate before extraction
-        self.validate_zip_contents(zip_path)
+        total = sum(info.file_size for info in entries)
+        done = 0
+        linked = []
+        for info in entries:
+            if self.blobs is None or info.is_dir():
+                zf.extract(info, dest_dir)
+            else:
+                # Hashed while streaming out of the archive, stored once, linked into the build
+                with zf.open(info) as src:
+                    sha256, size = self.blobs.ingest_stream(src)
+                if ingested is not None:
+                    ingested.add(sha256)
+                dest = dest_dir / info.filename
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                self.blobs.materialize(sha256, dest)
+                linked.append((info.filename, sha256, size))
+            done += info.file_size
+            if progress is not None:
+                progress("extracting", done, total)
+        return linked
+    
+    # ============== Builds ==============
+    
+    def activate_build(self, slug: str, build_id: str) -> Path:
+        """
+        Point /static-projects/{slug} at an existing build.
         
-        # Create destination directory
-        dest_dir = self.base_dir / slug
+        A temporary symlink is renamed over the current one, which is atomic:
+        requests see either the old build or the new one.
         
-        # Remove existing directory if it exists
-        if dest_dir.exists():
-            shutil.rmtree(dest_dir)
+        Args:
+            slug: Project slug
+            build_id: Build to publish
+            
+        Returns:
+            Path to the published project directory
+            
+        Raises:
+            BuildNotFoundError: If the build does not exist
+        """
+        _check_name(slug, "project slug")
+        if not _is_plain_name(build_id) or not (self.builds_dir / slug / build_id).is_dir():
+            raise BuildNotFoundError(f"Build {build_id} of project {slug} not found")
         
-        dest_dir.mkdir(parents=True, exist_ok=True)
+        link = self.base_dir / slug
+        if link.is_dir() and not link.is_symlink():
+            self._adopt_legacy_directory(slug)
         
+        tmp_link = self.base_dir / f".{slug}.{uuid.uuid4().hex}.link"
+        os.symlink(Path(BUILDS_DIRNAME) / slug / build_id, tmp_link)
         try:
-            with zipfile.ZipFile(zip_path, 'r') as zf:
-                # Extract all files
-                zf.extractall(dest_dir)
+            os.replace(tmp_link, link)
+        except OSError:
+            tmp_link.unlink(missing_ok=True)
+            raise
+        return link
+    
+    def _adopt_legacy_directory(self, slug: str) -> None:
+        """Move a project extracted before versioned builds into the builds directory."""
+        legacy_dir = self.builds_dir / slug / LEGACY_BUILD_ID
+        legacy_dir.parent.mkdir(parents=True, exist_ok=True)
+        if legacy_dir.exists():
+            shutil.rmtree(legacy_dir)
+        # One-time migration: the project is briefly missing between the two renames
+        os.replace(self.base_dir / slug, legacy_dir)
+    
+    def active_build(self, slug: str) -> Optional[str]:
+        """Id of the build /static-projects/{slug} points at, or None."""
+        link = self.base_dir / slug
+        if not link.is_symlink():
+            return None
+        return Path(os.readlink(link)).name
+    
+    def list_builds(self, slug: str) -> List[Dict]:
+        """
+        List the builds of a project, newest first.
+        
+        Args:
+            slug: Project slug
+            
+        Returns:
+            List of dicts with ``id``, ``created_at`` (unix time) and ``active``
+        """
+        _check_name(slug, "project slug")
+        project_builds = self.builds_dir / slug
+        if not project_builds.is_dir():
+            return []
+        
+        active = self.active_build(slug)
+        builds = []
+        for entry in os.scandir(project_builds):
+            if entry.name.startswith(".") or not entry.is_dir(follow_symlinks=False):
+                continue
+            builds.append({
+                "id": entry.name,
+                "created_at": entry.stat(follow_symlinks=False).st_mtime,
+                "active": entry.name == active,
+            })
+        builds.sort(key=lambda build: build["created_at"], reverse=True)
+        return builds
+    
+    def rollback(self, slug: str, build_id: Optional[str] = None) -> str:
+        """
+        Re-publish an earlier build.
+        
+        Args:
+            slug: Project slug
+            build_id: Build to publish; defaults to the newest build older
+                than the active one
             
-            return dest_dir
+        Returns:
+            Id of the build that is now active
             
-        except Exception as e:
-            # Clean up on failure
-            if dest_dir.exists():
-                shutil.rmtree(dest_dir)
-            raise ZipExtractionError(f"Failed to extract ZIP: {e}")
+        Raises:
+            BuildNotFoundError: If there is no such (or no older) build
+        """
+        if build_id is None:
+            builds = self.list_builds(slug)
+            active_index = next(
+                (i for i, build in enumerate(builds) if build["active"]), None
+            )
+            if active_index is None or active_index + 1 >= len(builds):
+                raise BuildNotFoundError(f"No earlier build of project {slug} to roll back to")
+            build_id = builds[active_index + 1]["id"]
+        
+        self.activate_build(slug, build_id)
+        return build_id
+    
+    def collect_garbage(self, slug: str, keep: int = settings.STATIC_PROJECT_BUILDS_KEEP) -> List[str]:
+        """
+        Remove all but the ``keep`` newest builds of a project, never touching
+        the active one, along with staging directories left by crashed publishes.
+        
+        Args:
+            slug: Project slug
+            keep: Number of builds to keep
+            
+        Returns:
+            Paths of the removed builds, whose blob references should be released
+        """
+        project_builds = self.builds_dir / slug
+        if not project_builds.is_dir():
+            return []
+        
+        stale_before = time.time() - STALE_STAGING_AGE
+        for entry in os.scandir(project_builds):
+            if entry.name.startswith(STAGING_PREFIX) and entry.stat().st_mtime < stale_before:
+                shutil.rmtree(entry.path, ignore_errors=True)
+        
+        removed = []
+        for build in self.list_builds(slug)[keep:]:
+            if build["active"]:
+                continue
+            build_dir = project_builds / build["id"]
+            shutil.rmtree(build_dir, ignore_errors=True)
+            removed.append(build_dir.as_posix())
+        return removed
+    
+    def precompress_assets(
+        self, project_dir: Path, progress: Optional[ProgressCallback] = None
+    ) -> int:
+        """
+        Write maximum-compression .gz (and .br, if brotli is installed)
+        siblings next to every text asset, so they are compressed once at
+        publish time instead of on every request.
+        
+        Args:
+            project_dir: Directory with the extracted project
+            progress: Optional callback receiving ("compressing", done, total)
+            
+        Returns:
+            Number of assets that got at least one compressed variant
+        """
+        assets = [
+            path for path in project_dir.rglob("*")
+            if path.suffix.lower() in COMPRESSIBLE_EXTENSIONS
+            and path.is_file()
+            and path.stat().st_size >= MIN_COMPRESS_SIZE
+        ]
+        if not assets:
+            return 0
+        
+        # zlib and brotli release the GIL, so threads compress in parallel
+        compressed = 0
+        with ThreadPoolExecutor(max_workers=settings.PRECOMPRESS_WORKERS) as pool:
+            for done, written in enumerate(pool.map(_write_compressed_variants, assets), 1):
+                compressed += written
+                if progress is not None:
+                    progress("compressing", done, len(assets))
+        return compressed
     
     def cleanup_project(self, slug: str) -> bool:
         """
-        Remove extracted project directory.
+        Remove a published project together with all of its builds.
         
         Args:
             slug: Project slug
             
         Returns:
-            True if directory was removed, False if it didn't exist
+            True if anything was removed, False if it didn't exist
         """
         project_dir = self.base_dir / slug
+        project_builds = self.builds_dir / slug
+        removed = False
         
-        if project_dir.exists():
+        if project_dir.is_symlink():
+            project_dir.unlink()
+            removed = True
+        elif project_dir.exists():
             shutil.rmtree(project_dir)
-            return True
+            removed = True
         
-        return False
+        if project_builds.exists():
+            shutil.rmtree(project_builds)
+            removed = True
+        
+        return removed
     
     def get_project_path(self, slug: str) -> Path | None:
         """
@@ -237,7 +616,37 @@ class ZipExtractService:
         
         files = []
         for path in project_dir.rglob("*"):
-            if path.is_file():
+            if path.is_file() and not _is_compressed_variant(path):
                 files.append(str(path.relative_to(project_dir)))
         
-        return files
\ No newline at end of file
+        return files
+
+
+def _is_plain_name(name: str) -> bool:
+    """True for a single, non-hidden path component."""
+    return bool(name) and not name.startswith(".") and "/" not in name and "\\" not in name
+
+
+def _check_name(name: str, what: str) -> None:
+    if not _is_plain_name(name):
+        raise ZipExtractionError(f"Invalid {what}: {name}")
+
+
+def _is_compressed_variant(path: Path) -> bool:
+    """True for .gz/.br files generated by ``precompress_assets``."""
+    return path.suffix in (".gz", ".br") and path.with_suffix("").is_file()
+
+
+def _write_compressed_variants(path: Path) -> bool:
+    """Write .gz/.br siblings of ``path`` when they are smaller than the original."""
+    data = path.read_bytes()
+    variants = [(".gz", gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append((".br", brotli.compress(data, quality=11)))
+    
+    written = False
+    for suffix, compressed in variants:
+        if len(compressed) < len(data):
+            path.with_name(path.name + suffix).write_bytes(compressed)
+            written = True
+    return written
@@ -63,7 +63,27 @@ export const uploadsAPI = {
         await api.delete(`/uploads/${filename}`);
     },
 
-    getUrl: (path) => path?.startsWith("http") ? path : `${BASE_URL}${path}`
+    // Keyset-paginated: pass the previous page's next_cursor as params.cursor
+    list: async (params = {}) => {
+        const { data } = await api.get("/uploads", { params });
+        return data;
+    },
+
+    getUrl: (path) => path?.startsWith("http") ? path : `${BASE_URL}${path}`,
+
+    // "url 480w, url 960w" from the API -> absolute URLs for <img srcSet>
+    getSrcSet: (srcset) => srcset
+        ?.split(", ")
+        .map((entry) => `${BASE_URL}${entry}`)
+        .join(", "),
+
+    // Rendered on first request and cached by the backend: { w, h, fmt }
+    getResizedUrl: (path, params) => {
+        const query = new URLSearchParams(
+            Object.entries(params).filter(([, value]) => value)
+        ).toString();
+        return `${uploadsAPI.getUrl(path)}${query ? `?${query}` : ""}`;
+    }
 };
 
 export const skillsAPI = {
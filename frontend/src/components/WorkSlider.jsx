@@ -84,6 +84,8 @@ const WorkSlider = () => {
                                     src={works[currentIndex].image_url?.startsWith("http") || works[currentIndex].image_url?.startsWith("/") 
                                         ? uploadsAPI.getUrl(works[currentIndex].image_url)
                                         : works[currentIndex].image_url}
+                                    srcSet={uploadsAPI.getSrcSet(works[currentIndex].image_srcset)}
+                                    sizes="(max-width: 768px) 100vw, 50vw"
                                     alt={works[currentIndex].title}
                                     initial={{ scale: 0.95, opacity: 0 }}
                                     animate={{ scale: 1, opacity: 1 }}
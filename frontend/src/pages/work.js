@@ -49,7 +49,13 @@ function Work() {
                         {projects.filter(p => !p.is_featured).map(project => (
                             <div className="work-card" key={project.id}>
                                 {project.image_url && (
-                                    <img src={getImageUrl(project)} alt={project.title} />
+                                    <img
+                                        src={getImageUrl(project)}
+                                        srcSet={uploadsAPI.getSrcSet(project.image_srcset)}
+                                        sizes="(max-width: 768px) 100vw, 400px"
+                                        loading="lazy"
+                                        alt={project.title}
+                                    />
                                 )}
                                 <div className="work-card-content">
                                     <h3>{project.title}</h3>